@@ -1,89 +1,402 @@
-from sqlalchemy import create_engine
-from sqlalchemy import inspect, text
+from fastapi import Request
+from sqlalchemy import create_engine, event, exc, make_url
+from sqlalchemy.engine import Connection
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 import os
+import threading
+import time
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Pula polaczen, konfigurowana z env:
+#   DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE
+#   DB_POOL_PRE_PING: always | idle | never
+#     idle = ping tylko gdy polaczenie lezalo w puli dluzej niz DB_POOL_PING_IDLE_SECONDS
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300"))
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "idle").lower()
+POOL_PING_IDLE_SECONDS = float(os.getenv("DB_POOL_PING_IDLE_SECONDS", "30"))
+
+# Profil SQLite (SQLITE_PROFILE=production):
+#   WAL + synchronous=NORMAL, mmap, wiekszy cache i busy_timeout na kazdym polaczeniu,
+#   jeden serializowany writer (pula 1 polaczenia) i osobna pula tylko do odczytu
+#   (SQLITE_READERS polaczen) dla GET-ow.
+SQLITE_URL = DATABASE_URL or "sqlite:///./app.db"
+IS_SQLITE = SQLITE_URL.startswith("sqlite")
+SQLITE_PRODUCTION = IS_SQLITE and os.getenv("SQLITE_PROFILE", "").lower() == "production"
+SQLITE_READERS = int(os.getenv("SQLITE_READERS", str(POOL_SIZE)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+
+
+class PoolStats:
+    """
+    Liczniki z eventow puli + czas oczekiwania na polaczenie.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.connects = 0
+            self.checkouts = 0
+            self.checkins = 0
+            self.invalidations = 0
+            self.pings = 0
+            self.timeouts = 0
+            self.wait_count = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.wait_count += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+            if timed_out:
+                self.timeouts += 1
+
+    def increment(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "pings": self.pings,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total / self.wait_count * 1000, 3) if self.wait_count else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+
+pool_stats = PoolStats()
+# osobne liczniki dla silnika async (ASYNC_DB=1)
+async_pool_stats = PoolStats()
+
+
+class _WaitTimingMixin:
+    """
+    Mierzy czas oczekiwania na wolne polaczenie w stats.
+    """
+    stats = pool_stats
+
+    def _do_get(self):
+        started = time.perf_counter()
+
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+
+        self.stats.record_wait(time.perf_counter() - started)
+
+        return connection
+
+
+class InstrumentedQueuePool(_WaitTimingMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_WaitTimingMixin, AsyncAdaptedQueuePool):
+    stats = async_pool_stats
+
+
+read_engine = None
+
 # Jeśli działa na Render → użyj Postgresa
-if DATABASE_URL:
+if not IS_SQLITE:
     engine = create_engine(
         DATABASE_URL,
-        pool_pre_ping=True,
-        pool_recycle=300
+        poolclass=InstrumentedQueuePool,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+        pool_pre_ping=POOL_PRE_PING == "always",
+        pool_recycle=POOL_RECYCLE
+    )
+# SQLite w profilu produkcyjnym: writer + readerzy
+elif SQLITE_PRODUCTION:
+    engine = create_engine(
+        SQLITE_URL,
+        connect_args={"check_same_thread": False},
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=POOL_TIMEOUT
+    )
+    read_engine = create_engine(
+        f"sqlite:///file:{make_url(SQLITE_URL).database}?mode=ro&uri=true",
+        connect_args={"check_same_thread": False},
+        poolclass=InstrumentedQueuePool,
+        pool_size=SQLITE_READERS,
+        max_overflow=0,
+        pool_timeout=POOL_TIMEOUT
     )
 # Jeśli działa lokalnie → użyj SQLite
 else:
     engine = create_engine(
-        "sqlite:///./app.db",
-        connect_args={"check_same_thread": False}
+        SQLITE_URL,
+        connect_args={"check_same_thread": False},
+        poolclass=InstrumentedQueuePool,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT
     )
 
+
+def apply_sqlite_pragmas(dbapi_connection, read_only: bool = False):
+    cursor = dbapi_connection.cursor()
+
+    try:
+        # journal_mode jest trwaly w pliku bazy, ustawia go writer
+        if not read_only:
+            cursor.execute("PRAGMA journal_mode=WAL")
+
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    finally:
+        cursor.close()
+
+
+if SQLITE_PRODUCTION:
+    @event.listens_for(engine, "connect")
+    def _on_sqlite_writer_connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection)
+
+    @event.listens_for(read_engine, "connect")
+    def _on_sqlite_reader_connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, read_only=True)
+
+
+def instrument_engine(engine, stats: PoolStats) -> None:
+    """
+    Liczniki z eventow puli i pre-ping w trybie idle.
+    """
+
+    def on_connect(dbapi_connection, connection_record):
+        stats.increment("connects")
+
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        stats.increment("checkouts")
+
+        if POOL_PRE_PING != "idle":
+            return
+
+        returned_at = connection_record.info.get("returned_at")
+
+        if returned_at is None or time.monotonic() - returned_at < POOL_PING_IDLE_SECONDS:
+            return
+
+        stats.increment("pings")
+        cursor = dbapi_connection.cursor()
+
+        try:
+            cursor.execute("SELECT 1")
+        except Exception as error:
+            # pula odrzuci polaczenie i sprobuje z nowym
+            raise exc.DisconnectionError() from error
+        finally:
+            cursor.close()
+
+    def on_checkin(dbapi_connection, connection_record):
+        stats.increment("checkins")
+        connection_record.info["returned_at"] = time.monotonic()
+
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        stats.increment("invalidations")
+
+    event.listen(engine, "connect", on_connect)
+    event.listen(engine, "checkout", on_checkout)
+    event.listen(engine, "checkin", on_checkin)
+    event.listen(engine, "invalidate", on_invalidate)
+
+
+# liczniki sa wspolne dla writera i readerow
+for _engine in (engine, read_engine):
+    if _engine is not None:
+        instrument_engine(_engine, pool_stats)
+
+
+def _overflow(pool: QueuePool) -> int:
+    # licznik QueuePool jest ujemny, dopoki pula nie osiagnie pool_size:
+    # raportujemy tylko polaczenia ponad pool_size
+    return max(pool.overflow(), 0)
+
+
+def _pool_snapshot(pool) -> dict:
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+    }
+
+
+def get_pool_status() -> dict:
+    pool = engine.pool
+
+    status = {
+        "pool_class": type(pool).__name__,
+        **_pool_snapshot(pool),
+        "overflow": _overflow(pool),
+        "max_overflow": 0 if SQLITE_PRODUCTION else MAX_OVERFLOW,
+        "timeout": POOL_TIMEOUT,
+        "pre_ping": POOL_PRE_PING,
+        **pool_stats.snapshot(),
+    }
+
+    if read_engine is not None:
+        status["sqlite_profile"] = "production"
+        status["readers"] = _pool_snapshot(read_engine.pool)
+
+    if async_engine is not None:
+        async_pool = async_engine.sync_engine.pool
+        status["async"] = {
+            "pool_class": type(async_pool).__name__,
+            **(
+                {**_pool_snapshot(async_pool), "overflow": _overflow(async_pool)}
+                if isinstance(async_pool, QueuePool)
+                else {}
+            ),
+            **async_pool_stats.snapshot(),
+        }
+
+    return status
+
+
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
     bind=engine
 )
 
+# Sesje tylko do odczytu; bez profilu produkcyjnego to ten sam silnik co SessionLocal
+ReadSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=read_engine if read_engine is not None else engine
+)
+
 Base = declarative_base()
 
 
-def ensure_match_external_columns():
-    inspector = inspect(engine)
+# Opcjonalny tryb async (ASYNC_DB=1): asyncpg dla Postgresa, aiosqlite lokalnie.
+# Goracne endpointy z routes/async_routes.py uzywaja wtedy AsyncSession.
+# W profilu SQLite production silnik async tylko czyta.
+ASYNC_DB = os.getenv("ASYNC_DB", "").lower() in ("1", "true", "yes")
+ASYNC_DB_WRITES = ASYNC_DB and not SQLITE_PRODUCTION
+
 
-    if not inspector.has_table("matches"):
-        return
+def to_async_url(url: str) -> str:
+    if url.startswith("postgres://"):
+        return "postgresql+asyncpg://" + url[len("postgres://"):]
+    if url.startswith("postgresql://"):
+        return "postgresql+asyncpg://" + url[len("postgresql://"):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
 
-    existing_columns = {column["name"] for column in inspector.get_columns("matches")}
 
-    with engine.begin() as connection:
-        if "external_source" not in existing_columns:
-            connection.execute(text("ALTER TABLE matches ADD COLUMN external_source VARCHAR"))
+async_engine = None
+AsyncSessionLocal = None
 
-        if "external_id" not in existing_columns:
-            connection.execute(text("ALTER TABLE matches ADD COLUMN external_id VARCHAR"))
+if ASYNC_DB:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
-        connection.execute(
-            text("CREATE INDEX IF NOT EXISTS ix_matches_external_id ON matches (external_id)")
+    if not IS_SQLITE:
+        # ta sama konfiguracja puli co silnik synchroniczny
+        async_engine = create_async_engine(
+            to_async_url(DATABASE_URL),
+            poolclass=InstrumentedAsyncQueuePool,
+            pool_size=POOL_SIZE,
+            max_overflow=MAX_OVERFLOW,
+            pool_timeout=POOL_TIMEOUT,
+            pool_pre_ping=POOL_PRE_PING == "always",
+            pool_recycle=POOL_RECYCLE
+        )
+    elif SQLITE_PRODUCTION:
+        # tylko odczyt, jak read_engine: zapisy zostaja na jedynym writerze
+        # (async POST /predictions nie jest wtedy rejestrowany)
+        async_engine = create_async_engine(
+            f"sqlite+aiosqlite:///file:{make_url(SQLITE_URL).database}?mode=ro&uri=true",
+            poolclass=InstrumentedAsyncQueuePool,
+            pool_size=SQLITE_READERS,
+            max_overflow=0,
+            pool_timeout=POOL_TIMEOUT
         )
 
+        @event.listens_for(async_engine.sync_engine, "connect")
+        def _on_sqlite_async_connect(dbapi_connection, connection_record):
+            apply_sqlite_pragmas(dbapi_connection, read_only=True)
+    else:
+        async_engine = create_async_engine(
+            to_async_url(SQLITE_URL),
+            poolclass=InstrumentedAsyncQueuePool,
+            pool_size=POOL_SIZE,
+            max_overflow=MAX_OVERFLOW,
+            pool_timeout=POOL_TIMEOUT
+        )
 
-def ensure_prediction_beers_column():
-    inspector = inspect(engine)
+    instrument_engine(async_engine.sync_engine, async_pool_stats)
 
-    if not inspector.has_table("predictions"):
-        return
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        autoflush=False,
+        expire_on_commit=False
+    )
 
-    existing_columns = {column["name"] for column in inspector.get_columns("predictions")}
 
-    if "beers_count" in existing_columns:
-        return
+def dialect_insert(db):
+    """
+    insert() z obsluga ON CONFLICT dla aktualnego silnika (Postgres lub SQLite).
+    db to Session albo Connection.
+    """
+    dialect = db.dialect if isinstance(db, Connection) else db.bind.dialect
 
-    with engine.begin() as connection:
-        connection.execute(
-            text("ALTER TABLE predictions ADD COLUMN beers_count INTEGER DEFAULT 0 NOT NULL")
-        )
+    if dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
 
+    return insert
 
-def ensure_prediction_unique_user_match_index():
-    inspector = inspect(engine)
 
-    if not inspector.has_table("predictions"):
-        return
+# Dependency do FastAPI; GET/HEAD ida do puli tylko do odczytu
+def get_db(request: Request):
+    if request.method in ("GET", "HEAD"):
+        db = ReadSessionLocal()
+    else:
+        db = SessionLocal()
 
-    with engine.begin() as connection:
-        connection.execute(
-            text(
-                "CREATE UNIQUE INDEX IF NOT EXISTS uq_predictions_user_match "
-                "ON predictions (user_id, match_id)"
-            )
-        )
+    try:
+        yield db
+    finally:
+        db.close()
 
 
-# Dependency do FastAPI
-def get_db():
-    db = SessionLocal()
+# Dla endpointow POST, ktore tylko czytaja (np. login)
+def get_read_db():
+    db = ReadSessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
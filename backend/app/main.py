@@ -1,24 +1,46 @@
+from contextlib import asynccontextmanager
+import os
+import threading
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .database import (
-    Base,
-    engine,
-    ensure_match_external_columns,
-    ensure_prediction_beers_column,
-    ensure_prediction_unique_user_match_index,
-)
+from .database import ASYNC_DB
+from .migrations import run_migrations
 from .routes import users, predictions
 from app.routes import matches
 from app.routes import admin
 from app.routes import champion
+from app.routes import bootstrap
+
+# STARTUP_WARM_UP=0 wylacza rozgrzewanie ciezkich modulow w tle
+STARTUP_WARM_UP = os.getenv("STARTUP_WARM_UP", "1").lower() not in ("0", "false", "no")
+
+
+def warm_up() -> None:
+    """
+    Laduje w tle to, co jest leniwe (passlib/argon2, numpy), zeby pierwszy
+    login czy projekcja nie placily za import. /health odpowiada od razu.
+    """
+    from app.services.passwords import get_pwd_context
+    from app.services import projection, what_if  # noqa: F401
+
+    get_pwd_context()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # jedno zapytanie o wersje schematu; DDL tylko gdy sa nowe migracje
+    schema_version = run_migrations()
+    print(f"Database connected and tables ready (schema v{schema_version})")
+
+    if STARTUP_WARM_UP:
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+    yield
 
-Base.metadata.create_all(bind=engine)
-ensure_match_external_columns()
-ensure_prediction_beers_column()
-ensure_prediction_unique_user_match_index()
-print("Database connected and tables ready")
 
 app = FastAPI(
+    lifespan=lifespan,
     title="MS 2026 Predictor API",
     description="API do typowania wyników MŚ 2026",
     version="1.0.0",
@@ -47,12 +69,19 @@ app.add_middleware(
 @app.get("/")
 def root():
     return {"status": "Backend działa 🚀"}
-    
+
+# async wersje goracych endpointow musza byc przed synchronicznymi
+if ASYNC_DB:
+    from app.routes import async_routes
+
+    app.include_router(async_routes.router)
+
 app.include_router(users.router)
 app.include_router(predictions.router)
 app.include_router(matches.router)
 app.include_router(admin.router)
 app.include_router(champion.router)
+app.include_router(bootstrap.router)
 
 @app.api_route("/health", methods=["GET", "HEAD"])
 def health():
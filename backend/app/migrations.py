@@ -0,0 +1,253 @@
+# Wersjonowane migracje schematu.
+# Kazdy krok ma kolejny numer i jest wykonywany raz; wykonane kroki sa zapisane
+# w tabeli schema_version. Start aplikacji robi tylko jedno zapytanie o wersje,
+# DDL idzie wylacznie gdy baza jest starsza niz MIGRATIONS.
+# Nowa zmiana schematu = nowy krok na koncu listy (nigdy nie edytujemy starych).
+from datetime import datetime, timezone
+from typing import Callable
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table
+from sqlalchemy import func, inspect, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.database import Base, dialect_insert, engine
+from app import models  # noqa: F401  rejestruje tabele w Base.metadata
+
+# klucz pg_advisory_xact_lock, zeby workery nie migrowaly rownolegle
+MIGRATION_LOCK_KEY = 2026
+
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+
+def _column_names(connection: Connection, table: str) -> set[str]:
+    return {column["name"] for column in inspect(connection).get_columns(table)}
+
+
+# ===============================
+# KROKI
+# ===============================
+
+def create_tables(connection: Connection) -> None:
+    Base.metadata.create_all(bind=connection)
+
+
+def add_match_external_columns(connection: Connection) -> None:
+    existing_columns = _column_names(connection, "matches")
+
+    if "external_source" not in existing_columns:
+        connection.execute(text("ALTER TABLE matches ADD COLUMN external_source VARCHAR"))
+
+    if "external_id" not in existing_columns:
+        connection.execute(text("ALTER TABLE matches ADD COLUMN external_id VARCHAR"))
+
+    connection.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_matches_external_id ON matches (external_id)")
+    )
+
+
+def add_match_start_time_index(connection: Connection) -> None:
+    connection.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_matches_start_time ON matches (start_time)")
+    )
+
+
+def add_prediction_beers_column(connection: Connection) -> None:
+    if "beers_count" in _column_names(connection, "predictions"):
+        return
+
+    connection.execute(
+        text("ALTER TABLE predictions ADD COLUMN beers_count INTEGER DEFAULT 0 NOT NULL")
+    )
+
+
+def add_prediction_unique_user_match_index(connection: Connection) -> None:
+    connection.execute(
+        text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_predictions_user_match "
+            "ON predictions (user_id, match_id)"
+        )
+    )
+
+
+def add_user_standings_username_column(connection: Connection) -> None:
+    if "username" not in _column_names(connection, "user_standings"):
+        connection.execute(text("ALTER TABLE user_standings ADD COLUMN username VARCHAR"))
+
+    connection.execute(text("DROP INDEX IF EXISTS ix_user_standings_rank"))
+    connection.execute(text("DROP INDEX IF EXISTS ix_user_standings_beers"))
+    connection.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_user_standings_order "
+            "ON user_standings (total_points DESC, exact_score_count DESC, username)"
+        )
+    )
+    connection.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_user_standings_beers_order "
+            "ON user_standings (beers DESC, username)"
+        )
+    )
+
+
+def add_user_token_version_column(connection: Connection) -> None:
+    if "token_version" in _column_names(connection, "users"):
+        return
+
+    connection.execute(
+        text("ALTER TABLE users ADD COLUMN token_version INTEGER DEFAULT 0 NOT NULL")
+    )
+
+
+def backfill_user_standings(connection: Connection) -> None:
+    from app.services.standings import rebuild_standings
+
+    db = Session(bind=connection)
+    try:
+        rebuild_standings(db)
+        db.flush()
+    finally:
+        db.close()
+
+
+def add_match_start_time_id_index(connection: Connection) -> None:
+    # (start_time, id) zastepuje indeks na samym start_time
+    connection.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_matches_start_time_id ON matches (start_time, id)")
+    )
+    connection.execute(text("DROP INDEX IF EXISTS ix_matches_start_time"))
+
+
+def add_match_external_unique_index(connection: Connection) -> None:
+    # duplikaty z wczesniejszych importow: klucz zostaje przy najstarszym meczu,
+    # nowsze traca powiazanie (nie kasujemy ich, bo maja typy)
+    connection.execute(
+        text(
+            "UPDATE matches SET external_source = NULL, external_id = NULL "
+            "WHERE external_source IS NOT NULL AND external_id IS NOT NULL "
+            "AND id NOT IN ("
+            "SELECT MIN(id) FROM matches "
+            "WHERE external_source IS NOT NULL AND external_id IS NOT NULL "
+            "GROUP BY external_source, external_id)"
+        )
+    )
+    connection.execute(
+        text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_matches_external "
+            "ON matches (external_source, external_id)"
+        )
+    )
+
+
+def add_hot_path_indexes(connection: Connection) -> None:
+    connection.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_predictions_match_id ON predictions (match_id)")
+    )
+    connection.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_matches_home_team ON matches (home_team)")
+    )
+    connection.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_matches_away_team ON matches (away_team)")
+    )
+
+
+def add_cache_versions_table(connection: Connection) -> None:
+    models.CacheVersion.__table__.create(bind=connection, checkfirst=True)
+    insert = dialect_insert(connection)
+    connection.execute(
+        insert(models.CacheVersion)
+        .values(
+            [
+                {"name": name, "version": 0, "updated_at": datetime.now(timezone.utc)}
+                for name in ("standings", "matches", "projection")
+            ]
+        )
+        .on_conflict_do_nothing(index_elements=["name"])
+    )
+
+
+def backfill_standings_snapshots(connection: Connection) -> None:
+    from app.services.standings import rebuild_snapshots
+
+    # mecze zakonczone przed wprowadzeniem snapshotow nie maja historii pozycji
+    models.StandingsSnapshot.__table__.create(bind=connection, checkfirst=True)
+    db = Session(bind=connection)
+    try:
+        rebuild_snapshots(db)
+        db.flush()
+    finally:
+        db.close()
+
+
+# (wersja, nazwa, krok) - tylko dopisywac na koncu
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "create_tables", create_tables),
+    (2, "match_external_columns", add_match_external_columns),
+    (3, "match_start_time_index", add_match_start_time_index),
+    (4, "prediction_beers_column", add_prediction_beers_column),
+    (5, "prediction_unique_user_match_index", add_prediction_unique_user_match_index),
+    (6, "user_standings_username_column", add_user_standings_username_column),
+    (7, "user_token_version_column", add_user_token_version_column),
+    (8, "backfill_user_standings", backfill_user_standings),
+    (9, "match_start_time_id_index", add_match_start_time_id_index),
+    (10, "match_external_unique_index", add_match_external_unique_index),
+    (11, "hot_path_indexes", add_hot_path_indexes),
+    (12, "cache_versions_table", add_cache_versions_table),
+    (13, "backfill_standings_snapshots", backfill_standings_snapshots),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# ===============================
+# URUCHAMIANIE
+# ===============================
+
+def get_schema_version(connection: Connection) -> int | None:
+    """
+    Aktualna wersja schematu albo None, gdy nie ma jeszcze tabeli schema_version.
+    """
+    try:
+        return connection.execute(select(func.max(schema_version.c.version))).scalar() or 0
+    except DBAPIError:
+        connection.rollback()
+        return None
+
+
+def run_migrations() -> int:
+    """
+    Sprawdza wersje jednym zapytaniem i wykonuje brakujace kroki.
+    Zwraca wersje schematu po migracji.
+    """
+    with engine.connect() as connection:
+        if get_schema_version(connection) == LATEST_VERSION:
+            return LATEST_VERSION
+
+    with engine.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+        schema_version.create(bind=connection, checkfirst=True)
+        current = get_schema_version(connection) or 0
+        insert = dialect_insert(connection)
+
+        for version, name, step in MIGRATIONS:
+            if version <= current:
+                continue
+
+            step(connection)
+            # inny worker (SQLite, bez blokady) mogl zapisac ten krok pierwszy
+            connection.execute(
+                insert(schema_version)
+                .values(version=version, name=name, applied_at=datetime.now(timezone.utc))
+                .on_conflict_do_nothing(index_elements=["version"])
+            )
+
+    return LATEST_VERSION
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy import Boolean, Column, Integer, LargeBinary, String, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -18,6 +18,9 @@ class User(Base):
 
     password_hash = Column(String, nullable=False)
 
+    # podbicie uniewaznia wszystkie wydane tokeny (claim "ver")
+    token_version = Column(Integer, default=0, nullable=False)
+
     predictions = relationship(
         "Prediction",
         back_populates="user",
@@ -29,6 +32,12 @@ class User(Base):
         cascade="all, delete-orphan",
         uselist=False
     )
+    standing = relationship(
+        "UserStanding",
+        back_populates="user",
+        cascade="all, delete-orphan",
+        uselist=False
+    )
 
 
 # ==============================
@@ -40,8 +49,9 @@ class Match(Base):
 
     id = Column(Integer, primary_key=True, index=True)
 
-    home_team = Column(String, nullable=False)
-    away_team = Column(String, nullable=False)
+    # indeksy dla champion.team_exists (OR po obu kolumnach)
+    home_team = Column(String, nullable=False, index=True)
+    away_team = Column(String, nullable=False, index=True)
 
     # 🔥 TIMEZONE-AWARE UTC
     start_time = Column(DateTime(timezone=True), nullable=False)
@@ -73,6 +83,12 @@ class Match(Base):
         back_populates="match",
         cascade="all, delete-orphan"
     )
+    standings_snapshot = relationship(
+        "StandingsSnapshot",
+        back_populates="match",
+        cascade="all, delete-orphan",
+        uselist=False
+    )
 
 
 # ==============================
@@ -88,7 +104,8 @@ class Prediction(Base):
     id = Column(Integer, primary_key=True, index=True)
 
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
-    match_id = Column(Integer, ForeignKey("matches.id", ondelete="CASCADE"))
+    # indeks: naliczanie punktow, liczniki typow, /matches/{id}/predictions
+    match_id = Column(Integer, ForeignKey("matches.id", ondelete="CASCADE"), index=True)
 
     home_score = Column(Integer, nullable=False)
     away_score = Column(Integer, nullable=False)
@@ -118,3 +135,90 @@ class ChampionPick(Base):
     )
 
     user = relationship("User", back_populates="champion_pick")
+
+
+# ==============================
+# USER STANDING
+# ==============================
+
+class UserStanding(Base):
+    """
+    Zmaterializowana tabela rankingu, aktualizowana przyrostowo
+    przez services.standings przy zapisie wynikow i piw.
+    """
+    __tablename__ = "user_standings"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+
+    # kopia users.username, zeby ranking czytac z jednego indeksu
+    username = Column(String, nullable=True)
+
+    total_points = Column(Integer, default=0, nullable=False)
+    settled_count = Column(Integer, default=0, nullable=False)
+    exact_score_count = Column(Integer, default=0, nullable=False)
+    beers = Column(Integer, default=0, nullable=False)
+
+    user = relationship("User", back_populates="standing")
+
+
+# Kolejnosc i kursor /matches: (start_time, id)
+Index("ix_matches_start_time_id", Match.start_time, Match.id)
+
+# Jeden mecz na fixture z zewnetrznego API (NULL-e nie koliduja)
+Index("uq_matches_external", Match.external_source, Match.external_id, unique=True)
+
+# Kolejnosc rankingu: punkty, dokladne wyniki, nazwa uzytkownika
+Index(
+    "ix_user_standings_order",
+    UserStanding.total_points.desc(),
+    UserStanding.exact_score_count.desc(),
+    UserStanding.username,
+)
+Index(
+    "ix_user_standings_beers_order",
+    UserStanding.beers.desc(),
+    UserStanding.username,
+)
+
+
+# ==============================
+# STANDINGS SNAPSHOT
+# ==============================
+
+class StandingsSnapshot(Base):
+    """
+    Stan rankingu po zakonczeniu meczu. data to spakowana tablica
+    trojek (user_id, pozycja, punkty) posortowana po user_id,
+    patrz services.standings.pack_standings.
+    """
+    __tablename__ = "standings_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    match_id = Column(Integer, ForeignKey("matches.id", ondelete="CASCADE"), unique=True, nullable=False)
+    users_count = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+
+    created_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now()
+    )
+
+    match = relationship("Match", back_populates="standings_snapshot")
+
+
+# ==============================
+# CACHE VERSION
+# ==============================
+
+class CacheVersion(Base):
+    """
+    Wspolna dla wszystkich procesow wersja cache odpowiedzi
+    (services.cache.VersionedCache). Podbijana w tej samej transakcji
+    co zmiana danych.
+    """
+    __tablename__ = "cache_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
@@ -5,7 +5,7 @@ import os
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_db, get_pool_status
 from app.models import Match, User
 from app.schemas.match import MatchResultUpdate
 from app.services.external_results import (
@@ -14,7 +14,10 @@ from app.services.external_results import (
     fetch_fixtures,
     fetch_fixtures_debug,
 )
+from app.services.cache import matches_cache, projection_cache, standings_cache
 from app.services.scoring import clear_final_result, set_final_result
+from app.services.standings import rebuild_snapshots, rebuild_standings
+from app.services.user_cache import user_cache
 from app.routes.users import get_current_user
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
@@ -157,6 +160,39 @@ def sync_match_results(
     }
 
 
+@router.post("/standings/rebuild")
+def rebuild_user_standings(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user),
+):
+    standings_count = rebuild_standings(db)
+    snapshots_count = rebuild_snapshots(db)
+    db.commit()
+
+    logger.info(
+        "Standings rebuilt by %s; users=%s snapshots=%s",
+        current_user.username,
+        standings_count,
+        snapshots_count,
+    )
+
+    return {
+        "message": "Standings rebuilt",
+        "standings_count": standings_count,
+        "snapshots_count": snapshots_count,
+    }
+
+
+@router.get("/cache-stats")
+def get_cache_stats(current_user: User = Depends(get_current_admin_user)):
+    return [standings_cache.stats(), matches_cache.stats(), projection_cache.stats(), user_cache.stats()]
+
+
+@router.get("/db-pool")
+def get_db_pool(current_user: User = Depends(get_current_admin_user)):
+    return get_pool_status()
+
+
 @router.get("/external-fixtures")
 def get_external_fixtures(
     match_date: date | None = Query(default=None, description="Optional date filter in YYYY-MM-DD format"),
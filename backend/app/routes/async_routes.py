@@ -0,0 +1,203 @@
+# Wersje async najczesciej wolanych endpointow, rejestrowane przed
+# synchronicznymi tylko przy ASYNC_DB=1 (patrz app/main.py).
+# W profilu SQLite production tylko odczyty: zapis idzie przez jedynego writera.
+# Zapytania i format odpowiedzi sa wspolne z routes/matches.py i routes/predictions.py.
+from datetime import datetime, timezone
+from typing import Annotated
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import ASYNC_DB_WRITES, get_async_db
+from ..models import Match, Prediction, User
+from ..services.cache import cached_response_async, invalidate_on_commit, matches_cache, standings_cache
+from ..services.standings import LEADERBOARD_ORDER, add_match_result
+from ..services.user_cache import CachedUser, token_version_cache, user_cache
+from .matches import MatchFilters, matches_page, matches_with_counts_statement
+from .predictions import (
+    PredictionCreate,
+    my_predictions_statement,
+    prediction_payload,
+    standing_payload,
+    standings_statement,
+    to_utc,
+)
+from .users import (
+    check_cached_principal,
+    claims_principal,
+    decode_access_token,
+    remember_token_version,
+    security,
+    token_version_statement,
+    user_by_username_statement,
+    user_principal,
+)
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+# ===============================
+# AUTH (AsyncSession, bez sesji z puli synchronicznej; kroki wspolne z routes/users.py)
+# ===============================
+
+async def current_token_version(db: AsyncSession, user_id: int) -> int:
+    current_version = token_version_cache.get(user_id)
+
+    if current_version is None:
+        current_version = remember_token_version(user_id, await db.scalar(token_version_statement(user_id)))
+
+    return current_version
+
+
+async def cached_principal(db: AsyncSession, token: str) -> CachedUser | None:
+    cached_user = user_cache.get(token)
+
+    if cached_user is None:
+        return None
+
+    return check_cached_principal(token, cached_user, await current_token_version(db, cached_user.id))
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db),
+) -> CachedUser:
+    token = credentials.credentials
+    cached_user = await cached_principal(db, token)
+
+    if cached_user is not None:
+        return cached_user
+
+    payload = decode_access_token(token)
+
+    return user_principal(token, payload, await db.scalar(user_by_username_statement(payload["sub"])))
+
+
+async def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db),
+) -> CachedUser:
+    token = credentials.credentials
+    cached_user = await cached_principal(db, token)
+
+    if cached_user is not None:
+        return cached_user
+
+    payload = decode_access_token(token)
+    user_id = payload.get("uid")
+
+    if user_id is None:
+        return await get_current_user(credentials, db)
+
+    return claims_principal(token, payload, await current_token_version(db, user_id))
+
+
+@router.get("/matches", tags=["Matches"], summary="Lista meczow")
+async def get_matches(
+    request: Request,
+    filters: Annotated[MatchFilters, Query()],
+    db: AsyncSession = Depends(get_async_db),
+):
+    async def build() -> list[dict] | dict:
+        return matches_page(filters, (await db.execute(matches_with_counts_statement(filters))).all())
+
+    cache_key = filters.cache_key()
+
+    if cache_key is None:
+        return await build()
+
+    return await cached_response_async(request, db, matches_cache, cache_key, build)
+
+
+@router.get("/leaderboard", tags=["Predictions"])
+async def leaderboard(
+    request: Request,
+    limit: int | None = Query(default=None, ge=1, le=500),
+    offset: int = Query(default=0, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+):
+    async def build() -> list[dict]:
+        standings = (await db.scalars(standings_statement(LEADERBOARD_ORDER, offset, limit))).all()
+
+        return [
+            standing_payload(offset + index + 1, standing)
+            for index, standing in enumerate(standings)
+        ]
+
+    return await cached_response_async(
+        request,
+        db,
+        standings_cache,
+        f"leaderboard:{offset}:{limit}",
+        build,
+    )
+
+
+@router.get("/my-predictions", tags=["Predictions"])
+async def get_my_predictions(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_principal),
+):
+    predictions = (await db.execute(my_predictions_statement(current_user.id))).all()
+
+    return [prediction_payload(prediction, match) for prediction, match in predictions]
+
+
+async def create_prediction(
+    prediction: PredictionCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    match = await db.get(Match, prediction.match_id)
+
+    if not match:
+        raise HTTPException(status_code=404, detail="Match not found")
+
+    if datetime.now(timezone.utc) >= to_utc(match.start_time):
+        raise HTTPException(
+            status_code=400,
+            detail="Typowanie zamknięte – mecz już się rozpoczął"
+        )
+
+    existing = await db.scalar(
+        select(Prediction.id).where(
+            Prediction.user_id == current_user.id,
+            Prediction.match_id == prediction.match_id,
+        )
+    )
+
+    if existing:
+        raise HTTPException(status_code=400, detail="Prediction already exists")
+
+    new_prediction = Prediction(
+        user_id=current_user.id,
+        match_id=prediction.match_id,
+        home_score=prediction.home_score,
+        away_score=prediction.away_score,
+        points=0,
+        beers_count=0,
+    )
+
+    db.add(new_prediction)
+    try:
+        await db.flush()
+        await db.run_sync(lambda session: add_match_result(session, match, user_id=current_user.id))
+        invalidate_on_commit(db.sync_session, matches_cache)
+        await db.commit()
+    except IntegrityError as exc:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Prediction already exists") from exc
+
+    logger.info(f"Prediction created user={current_user.id} match={match.id}")
+
+    return prediction_payload(new_prediction, match)
+
+
+if ASYNC_DB_WRITES:
+    router.post("/predictions", tags=["Predictions"])(create_prediction)
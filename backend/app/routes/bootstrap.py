@@ -0,0 +1,54 @@
+import json
+
+from fastapi import APIRouter, Depends
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..models import User, UserStanding
+from ..services.cache import matches_cache
+from ..services.standings import leaderboard_rank
+from .matches import MatchFilters, matches_page, matches_with_counts_statement
+from .predictions import my_predictions_statement, prediction_payload, standing_payload
+from .users import get_current_principal
+
+router = APIRouter(tags=["Users"])
+
+
+# ===============================
+# BOOTSTRAP
+# ===============================
+
+@router.get(
+    "/bootstrap",
+    summary="Dane startowe strony",
+    description=(
+        "Mecze z liczba typow, typy zalogowanego uzytkownika (klucz: match_id) "
+        "i jego pozycja w rankingu - zamiast /matches + /my-predictions + /leaderboard."
+    ),
+)
+def bootstrap(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_principal),
+):
+    filters = MatchFilters()
+    # ten sam wpis cache co GET /matches bez filtrow
+    matches = matches_cache.get_or_build(
+        db,
+        filters.cache_key(),
+        lambda: matches_page(filters, db.execute(matches_with_counts_statement(filters)).all()),
+    )
+
+    predictions = db.execute(my_predictions_statement(current_user.id)).all()
+
+    standing = db.get(UserStanding, current_user.id)
+
+    return {
+        "matches": json.loads(matches),
+        "predictions": {
+            prediction.match_id: prediction_payload(prediction, match)
+            for prediction, match in predictions
+        },
+        "standing": standing_payload(leaderboard_rank(db, standing), standing) if standing else None,
+        "total_users": db.scalar(select(func.count(UserStanding.user_id))),
+    }
@@ -5,7 +5,7 @@ from sqlalchemy.orm import Session
 
 from ..database import get_db
 from ..models import ChampionPick, Match, User
-from .users import get_current_user
+from .users import get_current_principal, get_current_user
 
 router = APIRouter(tags=["Champion"])
 
@@ -40,7 +40,7 @@ def team_exists(db: Session, team_name: str) -> bool:
 @router.get("/champion-pick")
 def get_champion_pick(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_principal),
 ):
     pick = db.query(ChampionPick).filter(
         ChampionPick.user_id == current_user.id
@@ -1,17 +1,29 @@
 from datetime import datetime, timezone
+from typing import Annotated, AsyncIterator, Literal
 from zoneinfo import ZoneInfo
-
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
-from sqlalchemy import func
+import base64
+import csv
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field, ValidationError
+from sqlalchemy import func, insert, or_, select, tuple_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from ..database import get_db
+from ..database import dialect_insert, get_db
 from ..models import Match, Prediction, User
+from ..services.cache import cached_response, invalidate_on_commit, matches_cache
+from ..services.standings import refresh_snapshots, refresh_snapshots_from, remove_match
 from .users import get_current_user
 
 router = APIRouter(tags=["Matches"])
 
+# Import meczow: wielkosc paczki INSERT i limit zwracanych bledow
+IMPORT_BATCH_SIZE = int(os.getenv("MATCH_IMPORT_BATCH_SIZE", "500"))
+IMPORT_MAX_ERRORS = int(os.getenv("MATCH_IMPORT_MAX_ERRORS", "100"))
+
 
 class MatchCreate(BaseModel):
     home_team: str
@@ -27,6 +39,31 @@ class MatchBulkCreate(BaseModel):
     matches: list[MatchCreate]
 
 
+class MatchFilters(BaseModel):
+    """
+    Filtry /matches (query string). Daty bez strefy to czas Europe/Warsaw,
+    tak jak przy tworzeniu meczu.
+    """
+    stage: str | None = None
+    group_name: str | None = None
+    date_from: datetime | None = None
+    date_to: datetime | None = None
+    is_finished: bool | None = None
+    upcoming: bool = False
+    limit: int | None = Field(default=None, ge=1, le=500)
+    cursor: str | None = None
+
+    def cache_key(self) -> str | None:
+        """
+        Klucz cache albo None, gdy wynik zalezy od biezacego czasu
+        (upcoming) lub zbior kluczy bylby nieograniczony (daty, kursor).
+        """
+        if self.upcoming or self.date_from or self.date_to or self.cursor:
+            return None
+
+        return f"matches:{self.stage}:{self.group_name}:{self.is_finished}:{self.limit}"
+
+
 def to_utc(dt: datetime) -> datetime:
     """
     Zawsze zwracamy timezone-aware UTC datetime
@@ -36,23 +73,119 @@ def to_utc(dt: datetime) -> datetime:
     return dt.astimezone(timezone.utc)
 
 
-def build_match(match: MatchCreate) -> Match:
-    start_time = match.start_time
+def local_to_utc(dt: datetime) -> datetime:
+    """
+    Czas bez strefy traktujemy jako Europe/Warsaw
+    """
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=ZoneInfo("Europe/Warsaw"))
+    return dt.astimezone(timezone.utc)
+
+
+def match_values(match: MatchCreate) -> dict:
+    return {
+        "home_team": match.home_team,
+        "away_team": match.away_team,
+        "start_time": local_to_utc(match.start_time),
+        "stage": match.stage,
+        "group_name": match.group_name,
+        "external_source": match.external_source,
+        "external_id": match.external_id,
+        "is_finished": False,
+    }
+
+
+def external_key(match: MatchCreate) -> tuple[str, str] | None:
+    """
+    Klucz meczu z zewnetrznego zrodla (unikalny indeks uq_matches_external).
+    """
+    if match.external_source is None or match.external_id is None:
+        return None
+    return match.external_source, match.external_id
+
+
+def existing_external_keys(db: Session, matches: list[MatchCreate]) -> set[tuple[str, str]]:
+    keys = {key for key in map(external_key, matches) if key is not None}
+
+    if not keys:
+        return set()
+
+    return set(
+        db.execute(
+            select(Match.external_source, Match.external_id).where(
+                tuple_(Match.external_source, Match.external_id).in_(keys)
+            )
+        ).all()
+    )
+
+
+def insert_matches(db: Session, matches: list[MatchCreate], upsert: bool = False) -> list[int]:
+    """
+    Jeden INSERT ... RETURNING id na paczke (executemany), bez refresh per mecz.
+    Id wracaja w kolejnosci wejscia. upsert=True: istniejacy mecz o tym samym
+    (external_source, external_id) dostaje nowy start_time, stage i group_name;
+    zmiana start_time zakonczonego meczu przelicza snapshoty rankingu.
+    W jednej paczce klucz moze wystapic tylko raz.
+    """
+    if not matches:
+        return []
+
+    # id -> start_time zakonczonych meczow, ktorym upsert moze zmienic kolejnosc snapshotow
+    moved_finished: dict[int, datetime] = {}
+
+    if upsert:
+        keys = {key for key in map(external_key, matches) if key is not None}
+
+        if keys:
+            moved_finished = dict(
+                db.execute(
+                    select(Match.id, Match.start_time).where(
+                        Match.is_finished.is_(True),
+                        tuple_(Match.external_source, Match.external_id).in_(keys),
+                    )
+                ).all()
+            )
+
+        statement = dialect_insert(db)(Match)
+        statement = statement.on_conflict_do_update(
+            index_elements=[Match.external_source, Match.external_id],
+            set_={
+                "start_time": statement.excluded.start_time,
+                "stage": statement.excluded.stage,
+                "group_name": statement.excluded.group_name,
+            },
+        )
+    else:
+        statement = insert(Match)
+
+    match_ids = list(
+        db.scalars(
+            statement.returning(Match.id, sort_by_parameter_order=True),
+            [match_values(match) for match in matches],
+        )
+    )
+
+    if moved_finished:
+        new_start_times = db.execute(
+            select(Match.id, Match.start_time).where(Match.id.in_(moved_finished))
+        ).all()
+        # snapshoty od wczesniejszej z pozycji: starej albo nowej
+        positions = [
+            min((moved_finished[match_id], match_id), (start_time, match_id))
+            for match_id, start_time in new_start_times
+            if start_time != moved_finished[match_id]
+        ]
+
+        if positions:
+            refresh_snapshots_from(db, *min(positions))
 
-    if start_time.tzinfo is None:
-        local_tz = ZoneInfo("Europe/Warsaw")
-        start_time = start_time.replace(tzinfo=local_tz)
+    return match_ids
 
-    start_time_utc = start_time.astimezone(timezone.utc)
 
-    return Match(
-        home_team=match.home_team,
-        away_team=match.away_team,
-        start_time=start_time_utc,
-        stage=match.stage,
-        group_name=match.group_name,
-        external_source=match.external_source,
-        external_id=match.external_id,
+def duplicate_external_key_error(key: tuple[str, str]) -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail=f"Match already exists: {key[0]}/{key[1]} (use upsert=true)",
     )
 
 
@@ -63,19 +196,27 @@ def build_match(match: MatchCreate) -> Match:
 )
 def create_match(
     match: MatchCreate,
+    upsert: bool = Query(default=False, description="Aktualizuj mecz o tym samym external_source/external_id"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    new_match = build_match(match)
+    existing = existing_external_keys(db, [match])
 
-    db.add(new_match)
-    db.commit()
-    db.refresh(new_match)
+    if existing and not upsert:
+        raise duplicate_external_key_error(external_key(match))
+
+    try:
+        match_id = insert_matches(db, [match], upsert=upsert)[0]
+        invalidate_on_commit(db, matches_cache)
+        db.commit()
+    except IntegrityError as exc:
+        db.rollback()
+        raise duplicate_external_key_error(external_key(match)) from exc
 
     return {
-        "message": "Match created",
-        "match_id": new_match.id,
-        "start_time_utc": new_match.start_time,
+        "message": "Match updated" if existing else "Match created",
+        "match_id": match_id,
+        "start_time_utc": local_to_utc(match.start_time),
     }
 
 
@@ -86,68 +227,374 @@ def create_match(
 )
 def create_matches_bulk(
     payload: MatchBulkCreate,
+    upsert: bool = Query(default=False, description="Aktualizuj mecze o tym samym external_source/external_id"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     if not payload.matches:
         raise HTTPException(status_code=400, detail="No matches provided")
 
-    new_matches = [build_match(match) for match in payload.matches]
+    seen = set()
 
-    db.add_all(new_matches)
-    db.commit()
+    for key in map(external_key, payload.matches):
+        if key in seen:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Duplicate external key in payload: {key[0]}/{key[1]}",
+            )
+        if key is not None:
+            seen.add(key)
+
+    existing = existing_external_keys(db, payload.matches)
 
-    for match in new_matches:
-        db.refresh(match)
+    if existing and not upsert:
+        raise duplicate_external_key_error(min(existing))
+
+    try:
+        match_ids = insert_matches(db, payload.matches, upsert=upsert)
+        invalidate_on_commit(db, matches_cache)
+        db.commit()
+    except IntegrityError as exc:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Match already exists (use upsert=true)") from exc
 
     return {
         "message": "Matches created",
-        "created_count": len(new_matches),
-        "match_ids": [match.id for match in new_matches],
+        "created_count": len(match_ids) - len(existing),
+        "updated_count": len(existing),
+        "match_ids": match_ids,
     }
 
 
-@router.get(
-    "/matches",
-    summary="Lista meczow",
-)
-def get_matches(db: Session = Depends(get_db)):
-    prediction_counts = (
-        db.query(
-            Prediction.match_id,
-            func.count(Prediction.id).label("predictions_count"),
-        )
-        .group_by(Prediction.match_id)
-        .subquery()
+# ===============================
+# IMPORT (NDJSON / CSV)
+# ===============================
+
+IMPORT_CSV_COLUMNS = tuple(MatchCreate.model_fields)
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Dzieli strumien body na linie bez wczytywania calosci do pamieci.
+    """
+    buffer = b""
+
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+
+        for line in lines:
+            yield line
+
+    if buffer:
+        yield buffer
+
+
+def parse_import_line(line: str, import_format: str, header: list[str] | None) -> MatchCreate:
+    if import_format == "ndjson":
+        return MatchCreate.model_validate_json(line)
+
+    values = next(csv.reader([line]))
+
+    if len(values) != len(header):
+        raise ValueError(f"Expected {len(header)} columns, got {len(values)}")
+
+    # pusta komorka CSV = brak wartosci
+    return MatchCreate.model_validate(
+        {column: value for column, value in zip(header, values) if value != ""}
     )
 
-    matches = (
-        db.query(
+
+def import_error_detail(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in item['loc']) or 'row'}: {item['msg']}"
+            for item in error.errors()
+        )
+
+    return str(error)
+
+
+@router.post(
+    "/matches/import",
+    summary="Import meczow z NDJSON lub CSV",
+    description=(
+        "Body czytane strumieniowo: NDJSON (jeden mecz na linie) albo CSV z naglowkiem "
+        f"({', '.join(IMPORT_CSV_COLUMNS)}). Po wczytaniu calego body poprawne wiersze "
+        "sa zapisywane paczkami w jednej transakcji, bledne wracaja w errors z numerem linii."
+    ),
+)
+async def import_matches(
+    request: Request,
+    import_format: Literal["ndjson", "csv"] | None = Query(default=None, alias="format"),
+    upsert: bool = Query(default=False, description="Aktualizuj mecze o tym samym external_source/external_id"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    if import_format is None:
+        content_type = request.headers.get("content-type", "")
+        import_format = "csv" if "csv" in content_type else "ndjson"
+
+    header = None
+    # (numer linii, mecz)
+    rows: list[tuple[int, MatchCreate]] = []
+    seen_keys: set[tuple[str, str]] = set()
+    errors: list[dict] = []
+    error_count = 0
+    updated_count = 0
+    line_number = 0
+
+    def add_error(line: int, detail: str) -> None:
+        nonlocal error_count
+        error_count += 1
+
+        if len(errors) < IMPORT_MAX_ERRORS:
+            errors.append({"line": line, "detail": detail})
+
+    # get_current_user moze juz pytac baze na tej sesji (zapis): polaczenie wraca
+    # do puli przed czytaniem body, wolny upload nie trzyma writera ani transakcji
+    await run_in_threadpool(db.close)
+
+    async for raw_line in iter_lines(request.stream()):
+        line_number += 1
+
+        try:
+            line = raw_line.decode("utf-8-sig" if line_number == 1 else "utf-8").rstrip("\r")
+
+            if not line.strip():
+                continue
+
+            if import_format == "csv" and header is None:
+                header = [column.strip() for column in next(csv.reader([line]))]
+                unknown = set(header) - set(IMPORT_CSV_COLUMNS)
+
+                if unknown:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Unknown CSV columns: {', '.join(sorted(unknown))}",
+                    )
+                continue
+
+            match = parse_import_line(line, import_format, header)
+        except (ValueError, UnicodeError, csv.Error) as error:
+            # ValidationError to tez ValueError
+            add_error(line_number, import_error_detail(error))
+            continue
+
+        key = external_key(match)
+
+        if key is not None:
+            if key in seen_keys:
+                add_error(line_number, f"Duplicate external key in import: {key[0]}/{key[1]}")
+                continue
+            seen_keys.add(key)
+
+        rows.append((line_number, match))
+
+    def insert_batch(batch: list[tuple[int, MatchCreate]]) -> list[int]:
+        nonlocal updated_count
+        existing = existing_external_keys(db, [match for _, match in batch])
+
+        if existing and not upsert:
+            for line, match in batch:
+                if external_key(match) in existing:
+                    add_error(line, duplicate_external_key_error(external_key(match)).detail)
+
+            batch = [(line, match) for line, match in batch if external_key(match) not in existing]
+
+        match_ids = insert_matches(db, [match for _, match in batch], upsert=upsert)
+        updated_count += len(existing) if upsert else 0
+
+        return match_ids
+
+    def write() -> list[int]:
+        nonlocal updated_count, error_count
+        match_ids = []
+
+        for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+            batch = rows[start:start + IMPORT_BATCH_SIZE]
+            batch_updated_count = updated_count
+            batch_error_count = error_count
+            batch_errors = len(errors)
+
+            try:
+                with db.begin_nested():
+                    match_ids += insert_batch(batch)
+                continue
+            except IntegrityError:
+                # klucz wstawiony rownolegle miedzy sprawdzeniem a INSERT: wiersz po wierszu,
+                # liczniki i bledy paczki wycofane razem z savepointem
+                updated_count = batch_updated_count
+                error_count = batch_error_count
+                del errors[batch_errors:]
+
+            for line, match in batch:
+                try:
+                    with db.begin_nested():
+                        match_ids += insert_batch([(line, match)])
+                except IntegrityError:
+                    key = external_key(match)
+                    add_error(
+                        line,
+                        duplicate_external_key_error(key).detail if key else "Match violates a database constraint",
+                    )
+
+        if match_ids:
+            invalidate_on_commit(db, matches_cache)
+            db.commit()
+
+        return match_ids
+
+    match_ids = await run_in_threadpool(write) if rows else []
+
+    errors.sort(key=lambda error: error["line"])
+
+    return {
+        "message": "Matches imported",
+        "created_count": len(match_ids) - updated_count,
+        "updated_count": updated_count,
+        "error_count": error_count,
+        "match_ids": match_ids,
+        "errors": errors,
+    }
+
+
+def encode_match_cursor(match: Match) -> str:
+    value = f"{match.start_time.isoformat()}|{match.id}"
+    return base64.urlsafe_b64encode(value.encode("utf-8")).decode("ascii")
+
+
+def parse_match_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        value = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        start_time, match_id = value.rsplit("|", 1)
+        return datetime.fromisoformat(start_time), int(match_id)
+    except (ValueError, UnicodeError) as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+
+
+def matches_with_counts_statement(filters: MatchFilters | None = None):
+    """
+    Mecze z liczba typow, w kolejnosci (start_time, id) - indeks ix_matches_start_time_id.
+    Przy limit liczba typow idzie skorelowanym podzapytaniem tylko dla zwroconych meczow,
+    bez grupowania calej tabeli predictions.
+    """
+    filters = filters or MatchFilters()
+
+    if filters.limit is None:
+        prediction_counts = (
+            select(
+                Prediction.match_id,
+                func.count(Prediction.id).label("predictions_count"),
+            )
+            .group_by(Prediction.match_id)
+            .subquery()
+        )
+        statement = select(
             Match,
             func.coalesce(prediction_counts.c.predictions_count, 0).label("predictions_count"),
+        ).outerjoin(prediction_counts, Match.id == prediction_counts.c.match_id)
+    else:
+        predictions_count = (
+            select(func.count(Prediction.id))
+            .where(Prediction.match_id == Match.id)
+            .scalar_subquery()
         )
-        .outerjoin(prediction_counts, Match.id == prediction_counts.c.match_id)
-        .order_by(Match.start_time.asc())
-        .all()
-    )
+        statement = select(Match, predictions_count.label("predictions_count"))
+
+    if filters.stage is not None:
+        statement = statement.where(Match.stage == filters.stage)
+
+    if filters.group_name is not None:
+        statement = statement.where(Match.group_name == filters.group_name)
+
+    if filters.is_finished is not None:
+        statement = statement.where(Match.is_finished.is_(filters.is_finished))
+
+    if filters.date_from is not None:
+        statement = statement.where(Match.start_time >= local_to_utc(filters.date_from))
+
+    if filters.date_to is not None:
+        statement = statement.where(Match.start_time < local_to_utc(filters.date_to))
+
+    if filters.upcoming:
+        statement = statement.where(Match.start_time > datetime.now(timezone.utc))
 
-    return [
-        {
-            "id": m.id,
-            "home_team": m.home_team,
-            "away_team": m.away_team,
-            "start_time": m.start_time,
-            "stage": m.stage,
-            "group_name": m.group_name,
-            "external_source": m.external_source,
-            "external_id": m.external_id,
-            "is_finished": m.is_finished,
-            "home_score": m.home_score,
-            "away_score": m.away_score,
-            "predictions_count": int(predictions_count or 0),
-        }
-        for m, predictions_count in matches
-    ]
+    if filters.cursor:
+        cursor_start_time, cursor_match_id = parse_match_cursor(filters.cursor)
+        statement = statement.where(
+            or_(
+                Match.start_time > cursor_start_time,
+                (Match.start_time == cursor_start_time) & (Match.id > cursor_match_id),
+            )
+        )
+
+    statement = statement.order_by(Match.start_time.asc(), Match.id.asc())
+
+    if filters.limit is not None:
+        statement = statement.limit(filters.limit + 1)
+
+    return statement
+
+
+def match_payload(m: Match, predictions_count: int | None) -> dict:
+    return {
+        "id": m.id,
+        "home_team": m.home_team,
+        "away_team": m.away_team,
+        "start_time": m.start_time,
+        "stage": m.stage,
+        "group_name": m.group_name,
+        "external_source": m.external_source,
+        "external_id": m.external_id,
+        "is_finished": m.is_finished,
+        "home_score": m.home_score,
+        "away_score": m.away_score,
+        "predictions_count": int(predictions_count or 0),
+    }
+
+
+def matches_page(filters: MatchFilters, matches: list) -> list[dict] | dict:
+    """
+    Bez limit: pelna lista jak dotad. Z limit: {"matches", "next_cursor"}.
+    """
+    if filters.limit is None:
+        return [match_payload(m, predictions_count) for m, predictions_count in matches]
+
+    next_cursor = None
+
+    if len(matches) > filters.limit:
+        matches = matches[:filters.limit]
+        next_cursor = encode_match_cursor(matches[-1][0])
+
+    return {
+        "matches": [match_payload(m, predictions_count) for m, predictions_count in matches],
+        "next_cursor": next_cursor,
+    }
+
+
+@router.get(
+    "/matches",
+    summary="Lista meczow",
+    description=(
+        "Filtry: stage, group_name, date_from/date_to, is_finished, upcoming. "
+        "Z limit zwraca strone {matches, next_cursor}; kolejna strona przez cursor."
+    ),
+)
+def get_matches(
+    request: Request,
+    filters: Annotated[MatchFilters, Query()],
+    db: Session = Depends(get_db),
+):
+    def build() -> list[dict] | dict:
+        return matches_page(filters, db.execute(matches_with_counts_statement(filters)).all())
+
+    cache_key = filters.cache_key()
+
+    if cache_key is None:
+        return build()
+
+    return cached_response(request, db, matches_cache, cache_key, build)
 
 
 @router.delete(
@@ -164,7 +611,15 @@ def delete_match(
     if not match:
         raise HTTPException(status_code=404, detail="Match not found")
 
+    remove_match(db, match)
     db.delete(match)
+    invalidate_on_commit(db, matches_cache)
+
+    # pozniejsze snapshoty rankingu zawieraly punkty z tego meczu
+    if match.is_finished:
+        db.flush()
+        refresh_snapshots(db, match)
+
     db.commit()
 
     return {"message": "Match deleted"}
@@ -1,14 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import func, or_, select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from sqlalchemy import case, func
 from pydantic import BaseModel, Field
 from datetime import datetime, timezone
-
-from ..database import get_db
-from ..models import Prediction, Match, User
+from typing import Literal
+
+from ..database import dialect_insert, get_db
+from ..models import Prediction, Match, StandingsSnapshot, User, UserStanding
+from ..services.cache import (
+    cached_response,
+    invalidate_on_commit,
+    matches_cache,
+    projection_cache,
+    standings_cache,
+    versioned_response,
+)
 from ..services.scoring import set_final_result
-from .users import get_current_user
+from ..services.standings import (
+    BEER_LEADERBOARD_ORDER,
+    LEADERBOARD_ORDER,
+    add_beers,
+    add_match_result,
+    leaderboard_rank,
+    remove_match_result,
+    snapshot_entry,
+    unpack_standings,
+)
+from .matches import encode_match_cursor, parse_match_cursor
+from .users import get_current_principal, get_current_user
 
 import logging
 
@@ -28,6 +48,10 @@ class PredictionCreate(BaseModel):
     away_score: int = Field(..., ge=0, le=20)
 
 
+class PredictionBulkCreate(BaseModel):
+    predictions: list[PredictionCreate] = Field(..., min_length=1, max_length=200)
+
+
 class PredictionUpdate(BaseModel):
     home_score: int = Field(..., ge=0, le=20)
     away_score: int = Field(..., ge=0, le=20)
@@ -119,6 +143,9 @@ def create_prediction(
 
     db.add(new_prediction)
     try:
+        db.flush()
+        add_match_result(db, match, user_id=current_user.id)
+        invalidate_on_commit(db, matches_cache)
         db.commit()
     except IntegrityError as exc:
         db.rollback()
@@ -134,6 +161,103 @@ def create_prediction(
     return prediction_payload(new_prediction, match)
 
 
+# ==============================
+# BULK CREATE / UPDATE PREDICTIONS
+# ==============================
+
+@router.post("/predictions/bulk")
+def create_predictions_bulk(
+    payload: PredictionBulkCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+
+    match_ids = {item.match_id for item in payload.predictions}
+    matches = {
+        match.id: match
+        for match in db.query(Match).filter(Match.id.in_(match_ids)).all()
+    }
+    existing_match_ids = {
+        row.match_id
+        for row in db.query(Prediction.match_id).filter(
+            Prediction.user_id == current_user.id,
+            Prediction.match_id.in_(match_ids)
+        )
+    }
+
+    now = datetime.now(timezone.utc)
+    rows = {}
+    items = []
+
+    for item in payload.predictions:
+        match = matches.get(item.match_id)
+
+        if item.match_id in rows:
+            items.append({"match_id": item.match_id, "status": "duplicate", "detail": "Duplicate match_id"})
+        elif not match:
+            items.append({"match_id": item.match_id, "status": "not_found", "detail": "Match not found"})
+        elif match.is_finished or now >= to_utc(match.start_time):
+            items.append(
+                {
+                    "match_id": item.match_id,
+                    "status": "locked",
+                    "detail": "Typowanie zamknięte – mecz już się rozpoczął",
+                }
+            )
+        else:
+            rows[item.match_id] = {
+                "user_id": current_user.id,
+                "match_id": item.match_id,
+                "home_score": item.home_score,
+                "away_score": item.away_score,
+                "points": 0,
+                "beers_count": 0,
+            }
+            items.append(
+                {
+                    "match_id": item.match_id,
+                    "status": "updated" if item.match_id in existing_match_ids else "created",
+                }
+            )
+
+    prediction_ids = {}
+
+    if rows:
+        insert = dialect_insert(db)
+        statement = insert(Prediction).values(list(rows.values()))
+        statement = statement.on_conflict_do_update(
+            index_elements=[Prediction.user_id, Prediction.match_id],
+            set_={
+                "home_score": statement.excluded.home_score,
+                "away_score": statement.excluded.away_score,
+            },
+        ).returning(Prediction.id, Prediction.match_id)
+
+        prediction_ids = {row.match_id: row.id for row in db.execute(statement)}
+
+        # nowe typy zmieniaja predictions_count w /matches
+        if len(rows) > len(existing_match_ids & rows.keys()):
+            invalidate_on_commit(db, matches_cache)
+
+        db.commit()
+
+    for item in items:
+        if item["status"] in ("created", "updated"):
+            item["prediction_id"] = prediction_ids.get(item["match_id"])
+
+    logger.info(
+        "Bulk predictions user=%s saved=%s rejected=%s",
+        current_user.id,
+        len(rows),
+        len(items) - len(rows),
+    )
+
+    return {
+        "saved_count": len(rows),
+        "items": items,
+    }
+
+
 # ==============================
 # UPDATE PREDICTION
 # ==============================
@@ -169,9 +293,13 @@ def update_prediction(
             detail="Typowanie zamknięte – mecz już się rozpoczął"
         )
 
+    remove_match_result(db, match, user_id=current_user.id)
+
     prediction.home_score = data.home_score
     prediction.away_score = data.away_score
 
+    db.flush()
+    add_match_result(db, match, user_id=current_user.id)
     db.commit()
     db.refresh(prediction)
 
@@ -184,36 +312,23 @@ def update_prediction(
 # MY PREDICTIONS
 # ==============================
 
+def my_predictions_statement(user_id: int):
+    return (
+        select(Prediction, Match)
+        .join(Match, Match.id == Prediction.match_id)
+        .where(Prediction.user_id == user_id)
+    )
+
+
 @router.get("/my-predictions")
 def get_my_predictions(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_principal)
 ):
 
-    predictions = (
-        db.query(Prediction)
-        .join(Match)
-        .filter(Prediction.user_id == current_user.id)
-        .all()
-    )
+    predictions = db.execute(my_predictions_statement(current_user.id)).all()
 
-    return [
-        {
-            "id": p.id,
-            "match_id": p.match.id,
-            "home_team": p.match.home_team,
-            "away_team": p.match.away_team,
-            "start_time": p.match.start_time,
-            "is_finished": p.match.is_finished,
-            "final_home_score": p.match.home_score,
-            "final_away_score": p.match.away_score,
-            "prediction_home": p.home_score,
-            "prediction_away": p.away_score,
-            "beers_count": p.beers_count,
-            "points": p.points
-        }
-        for p in predictions
-    ]
+    return [prediction_payload(prediction, match) for prediction, match in predictions]
 
 
 # ==============================
@@ -241,6 +356,7 @@ def update_prediction_beers(
         Match.id == prediction.match_id
     ).first()
 
+    add_beers(db, current_user.id, data.beers_count - (prediction.beers_count or 0))
     prediction.beers_count = data.beers_count
 
     db.commit()
@@ -285,99 +401,267 @@ def finish_match(
 # LEADERBOARD
 # ==============================
 
+def standing_payload(position: int, standing: UserStanding) -> dict:
+    return {
+        "position": position,
+        "user_id": standing.user_id,
+        "username": standing.username,
+        "points": standing.total_points,
+        "settled_predictions_count": standing.settled_count,
+        "exact_score_count": standing.exact_score_count,
+        "accuracy": round((standing.total_points / (standing.settled_count * 2)) * 100)
+        if standing.settled_count > 0
+        else None,
+    }
+
+
+def standings_statement(order, offset: int = 0, limit: int | None = None):
+    statement = select(UserStanding).order_by(*order).offset(offset)
+
+    if limit is not None:
+        statement = statement.limit(limit)
+
+    return statement
+
+
+def build_leaderboard(db: Session, offset: int = 0, limit: int | None = None) -> list[dict]:
+    standings = db.scalars(standings_statement(LEADERBOARD_ORDER, offset, limit)).all()
+
+    return [
+        standing_payload(offset + index + 1, standing)
+        for index, standing in enumerate(standings)
+    ]
+
+
 @router.get("/leaderboard")
-def leaderboard(db: Session = Depends(get_db)):
-    exact_score_count = func.coalesce(
-        func.sum(
-            case(
-                (
-                    (Match.is_finished.is_(True))
-                    & (Prediction.home_score == Match.home_score)
-                    & (Prediction.away_score == Match.away_score),
-                    1,
-                ),
-                else_=0,
-            )
-        ),
-        0,
+def leaderboard(
+    request: Request,
+    limit: int | None = Query(default=None, ge=1, le=500),
+    offset: int = Query(default=0, ge=0),
+    db: Session = Depends(get_db),
+):
+    return cached_response(
+        request,
+        db,
+        standings_cache,
+        f"leaderboard:{offset}:{limit}",
+        lambda: build_leaderboard(db, offset, limit),
     )
 
-    results = (
-        db.query(
-            User.id,
-            User.username,
-            func.coalesce(func.sum(Prediction.points), 0).label("total_points"),
-            func.count(Match.id).filter(Match.is_finished.is_(True)).label("settled_predictions_count"),
-            exact_score_count.label("exact_score_count"),
-        )
-        .outerjoin(Prediction, Prediction.user_id == User.id)
-        .outerjoin(Match, Match.id == Prediction.match_id)
-        .group_by(User.id)
-        .order_by(
-            func.sum(Prediction.points).desc(),
-            exact_score_count.desc(),
-            User.username.asc(),
+
+@router.get("/leaderboard/me")
+def leaderboard_me(
+    request: Request,
+    neighbours: int = Query(default=2, ge=0, le=50),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_principal),
+):
+    def build() -> dict:
+        standing = db.query(UserStanding).filter(
+            UserStanding.user_id == current_user.id
+        ).first()
+
+        if not standing:
+            raise HTTPException(status_code=404, detail="Standing not found")
+
+        position = leaderboard_rank(db, standing)
+        offset = max(position - 1 - neighbours, 0)
+
+        return {
+            "position": position,
+            "total_users": db.query(func.count(UserStanding.user_id)).scalar(),
+            "entries": build_leaderboard(db, offset, position - offset + neighbours),
+        }
+
+    return cached_response(
+        request,
+        db,
+        standings_cache,
+        f"leaderboard-me:{current_user.id}:{neighbours}",
+        build,
+    )
+
+
+@router.get("/leaderboard/movement")
+def leaderboard_movement(request: Request, db: Session = Depends(get_db)):
+    return cached_response(
+        request,
+        db,
+        standings_cache,
+        "leaderboard-movement",
+        lambda: build_leaderboard_movement(db),
+    )
+
+
+def build_leaderboard_movement(db: Session) -> list[dict]:
+    snapshots = (
+        db.query(StandingsSnapshot)
+        .join(Match, Match.id == StandingsSnapshot.match_id)
+        .order_by(Match.start_time.desc(), Match.id.desc())
+        .limit(2)
+        .all()
+    )
+
+    if not snapshots:
+        return []
+
+    latest = unpack_standings(snapshots[0].data)
+    previous = unpack_standings(snapshots[1].data) if len(snapshots) > 1 else None
+    usernames = dict(db.query(UserStanding.user_id, UserStanding.username).all())
+
+    movement = []
+
+    for index in range(0, len(latest), 3):
+        user_id, position, points = latest[index:index + 3]
+        previous_entry = snapshot_entry(previous, user_id) if previous else None
+        previous_position = previous_entry[0] if previous_entry else None
+
+        movement.append(
+            {
+                "position": position,
+                "previous_position": previous_position,
+                "movement": previous_position - position if previous_position else 0,
+                "user_id": user_id,
+                "username": usernames.get(user_id),
+                "points": points,
+            }
         )
+
+    return sorted(movement, key=lambda item: item["position"])
+
+
+@router.get("/leaderboard/projection")
+def leaderboard_projection(request: Request, db: Session = Depends(get_db)):
+    # numpy ladowany przy pierwszym uzyciu, nie przy starcie procesu
+    from ..services.projection import projection_job
+
+    # jedno liczenie naraz; w trakcie przeliczania poprzedni wynik
+    state, body = projection_job.get(projection_cache.current(db))
+
+    return versioned_response(request, projection_cache, "projection", state, body)
+
+
+@router.get("/leaderboard/{user_id}/rank-history")
+def leaderboard_rank_history(user_id: int, request: Request, db: Session = Depends(get_db)):
+    return cached_response(
+        request,
+        db,
+        standings_cache,
+        f"rank-history:{user_id}",
+        lambda: build_rank_history(db, user_id),
+    )
+
+
+def build_rank_history(db: Session, user_id: int) -> list[dict]:
+    snapshots = (
+        db.query(StandingsSnapshot, Match)
+        .join(Match, Match.id == StandingsSnapshot.match_id)
+        .order_by(Match.start_time.asc(), Match.id.asc())
         .all()
     )
 
-    return [
-        {
-            "position": index + 1,
-            "user_id": r.id,
-            "username": r.username,
-            "points": int(r.total_points),
-            "settled_predictions_count": int(r.settled_predictions_count),
-            "exact_score_count": int(r.exact_score_count),
-            "accuracy": round((int(r.total_points) / (int(r.settled_predictions_count) * 2)) * 100)
-            if int(r.settled_predictions_count) > 0
-            else None,
-        }
-        for index, r in enumerate(results)
-    ]
+    history = []
+
+    for snapshot, match in snapshots:
+        entry = snapshot_entry(unpack_standings(snapshot.data), user_id)
+
+        if entry is None:
+            continue
+
+        history.append(
+            {
+                "match_id": match.id,
+                "home_team": match.home_team,
+                "away_team": match.away_team,
+                "start_time": match.start_time,
+                "position": entry[0],
+                "points": entry[1],
+                "users_count": snapshot.users_count,
+            }
+        )
+
+    return history
 
 
 @router.get("/leaderboard/{user_id}/history")
-def leaderboard_user_history(user_id: int, db: Session = Depends(get_db)):
+def leaderboard_user_history(
+    user_id: int,
+    limit: int | None = Query(default=None, ge=1, le=200),
+    cursor: str | None = Query(default=None),
+    db: Session = Depends(get_db),
+):
     user = db.query(User).filter(User.id == user_id).first()
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
     now = datetime.now(timezone.utc)
-    predictions = (
-        db.query(Prediction)
-        .join(Match)
-        .filter(Prediction.user_id == user_id)
-        .order_by(Match.start_time.desc())
-        .all()
+    visible = (Prediction.user_id == user_id) & (Match.start_time <= now)
+
+    def visible_total(column):
+        return (
+            select(func.coalesce(func.sum(column), 0))
+            .select_from(Prediction)
+            .join(Match, Match.id == Prediction.match_id)
+            .where(visible)
+            .scalar_subquery()
+        )
+
+    points_total = visible_total(Prediction.points)
+    beers_total = visible_total(Prediction.beers_count)
+
+    query = (
+        db.query(Prediction, Match, points_total, beers_total)
+        .join(Match, Match.id == Prediction.match_id)
+        .filter(visible)
+        .order_by(Match.start_time.desc(), Match.id.desc())
     )
-    visible_predictions = [
-        prediction
-        for prediction in predictions
-        if to_utc(prediction.match.start_time) <= now
-    ]
+
+    if cursor:
+        cursor_start_time, cursor_match_id = parse_match_cursor(cursor)
+        query = query.filter(
+            or_(
+                Match.start_time < cursor_start_time,
+                (Match.start_time == cursor_start_time) & (Match.id < cursor_match_id),
+            )
+        )
+
+    if limit is not None:
+        query = query.limit(limit + 1)
+
+    rows = query.all()
+    next_cursor = None
+
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_match_cursor(rows[-1][1])
+
+    if rows:
+        points, beers = rows[0][2], rows[0][3]
+    else:
+        points, beers = db.query(points_total, beers_total).one()
 
     return {
         "user_id": user.id,
         "username": user.username,
-        "points": sum(int(prediction.points or 0) for prediction in visible_predictions),
-        "beers": sum(int(prediction.beers_count or 0) for prediction in visible_predictions),
+        "points": int(points),
+        "beers": int(beers),
+        "next_cursor": next_cursor,
         "predictions": [
             {
-                "match_id": prediction.match.id,
-                "home_team": prediction.match.home_team,
-                "away_team": prediction.match.away_team,
-                "start_time": prediction.match.start_time,
-                "is_finished": prediction.match.is_finished,
-                "final_home_score": prediction.match.home_score,
-                "final_away_score": prediction.match.away_score,
+                "match_id": match.id,
+                "home_team": match.home_team,
+                "away_team": match.away_team,
+                "start_time": match.start_time,
+                "is_finished": match.is_finished,
+                "final_home_score": match.home_score,
+                "final_away_score": match.away_score,
                 "prediction_home": prediction.home_score,
                 "prediction_away": prediction.away_score,
                 "beers_count": prediction.beers_count,
-                "points": prediction.points if prediction.match.is_finished else None,
+                "points": prediction.points if match.is_finished else None,
             }
-            for prediction in visible_predictions
+            for prediction, match, _, _ in rows
         ],
     }
 
@@ -387,32 +671,72 @@ def leaderboard_user_history(user_id: int, db: Session = Depends(get_db)):
 # ==============================
 
 @router.get("/beer-leaderboard")
-def beer_leaderboard(db: Session = Depends(get_db)):
-    total_beers = func.coalesce(func.sum(Prediction.beers_count), 0)
+def beer_leaderboard(request: Request, db: Session = Depends(get_db)):
+    return cached_response(
+        request,
+        db,
+        standings_cache,
+        "beer-leaderboard",
+        lambda: build_beer_leaderboard(db),
+    )
 
+
+def build_beer_leaderboard(db: Session) -> list[dict]:
     results = (
         db.query(
-            User.id,
-            User.username,
-            total_beers.label("total_beers")
+            UserStanding.user_id,
+            UserStanding.username,
+            UserStanding.beers,
         )
-        .outerjoin(Prediction, Prediction.user_id == User.id)
-        .group_by(User.id)
-        .order_by(total_beers.desc(), User.username.asc())
+        .order_by(*BEER_LEADERBOARD_ORDER)
         .all()
     )
 
     return [
         {
             "position": index + 1,
-            "user_id": r.id,
+            "user_id": r.user_id,
             "username": r.username,
-            "beers": int(r.total_beers)
+            "beers": r.beers
         }
         for index, r in enumerate(results)
     ]
 
 
+# ==============================
+# STANDINGS (POINTS + BEERS)
+# ==============================
+
+@router.get("/standings")
+def standings(
+    request: Request,
+    sort: Literal["points", "beers"] = Query(default="points"),
+    limit: int | None = Query(default=None, ge=1, le=500),
+    offset: int = Query(default=0, ge=0),
+    db: Session = Depends(get_db),
+):
+    return cached_response(
+        request,
+        db,
+        standings_cache,
+        f"standings:{sort}:{offset}:{limit}",
+        lambda: build_standings(db, sort, offset, limit),
+    )
+
+
+def build_standings(db: Session, sort: str, offset: int = 0, limit: int | None = None) -> list[dict]:
+    order = BEER_LEADERBOARD_ORDER if sort == "beers" else LEADERBOARD_ORDER
+    standings = db.scalars(standings_statement(order, offset, limit)).all()
+
+    return [
+        {
+            **standing_payload(offset + index + 1, standing),
+            "beers": standing.beers,
+        }
+        for index, standing in enumerate(standings)
+    ]
+
+
 # ==============================
 # VIEW ALL PREDICTIONS (AFTER START)
 # ==============================
@@ -421,7 +745,7 @@ def beer_leaderboard(db: Session = Depends(get_db)):
 def get_match_predictions(
     match_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_principal)
 ):
 
     match = db.query(Match).filter(Match.id == match_id).first()
@@ -438,8 +762,9 @@ def get_match_predictions(
             detail="Predictions visible only after match start"
         )
 
+    # username w tym samym zapytaniu (bez leniwego p.user per typ)
     predictions = (
-        db.query(Prediction)
+        db.query(Prediction, User.username)
         .join(User)
         .filter(Prediction.match_id == match_id)
         .all()
@@ -447,9 +772,81 @@ def get_match_predictions(
 
     return [
         {
-            "username": p.user.username,
+            "username": username,
             "prediction": f"{p.home_score}:{p.away_score}",
             "points": p.points if match.is_finished else None
         }
-        for p in predictions
+        for p, username in predictions
     ]
+
+
+# ==============================
+# WHAT-IF SCENARIOS (AFTER START)
+# ==============================
+
+@router.get("/matches/{match_id}/what-if")
+def get_match_what_if(
+    match_id: int,
+    request: Request,
+    max_goals: int = Query(default=6, ge=0, le=10),
+    top: int = Query(default=10, ge=0, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_principal),
+):
+
+    match = db.query(Match).filter(Match.id == match_id).first()
+
+    if not match:
+        raise HTTPException(status_code=404, detail="Match not found")
+
+    now = datetime.now(timezone.utc)
+    match_start = to_utc(match.start_time)
+
+    if now < match_start:
+        raise HTTPException(
+            status_code=403,
+            detail="Predictions visible only after match start"
+        )
+
+    from ..services.what_if import get_what_if_grid
+
+    def build() -> dict:
+        grid = get_what_if_grid(db, match, max_goals, standings_cache.current(db).version)
+        own_index = grid.user_index(current_user.id)
+        scenarios = []
+
+        for scenario in range(len(grid.home_scores)):
+            points = grid.points[scenario]
+            positions = grid.positions[scenario]
+
+            scenarios.append(
+                {
+                    "home_score": int(grid.home_scores[scenario]),
+                    "away_score": int(grid.away_scores[scenario]),
+                    "my_position": int(positions[own_index]) if own_index is not None else None,
+                    "my_points": int(points[own_index]) if own_index is not None else None,
+                    "top": [
+                        {
+                            "position": int(positions[index]),
+                            "user_id": grid.user_ids[index],
+                            "username": grid.usernames[index],
+                            "points": int(points[index]),
+                        }
+                        for index in grid.leaders[scenario, :top]
+                    ],
+                }
+            )
+
+        return {
+            "match_id": match.id,
+            "is_finished": match.is_finished,
+            "scenarios": scenarios,
+        }
+
+    return cached_response(
+        request,
+        db,
+        standings_cache,
+        f"what-if:{match_id}:{max_goals}:{top}:{current_user.id}",
+        build,
+    )
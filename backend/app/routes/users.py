@@ -1,14 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
-from passlib.context import CryptContext
 from pydantic import BaseModel, EmailStr
 from datetime import datetime, timedelta, timezone
 import os
 
-from ..database import get_db
-from ..models import User
+from ..database import get_db, get_read_db
+from ..models import User, UserStanding
+from ..services.cache import invalidate_on_commit, standings_cache
+from ..services.email_log import email_log
+from ..services.passwords import hash_password_async, verify_password_async
+from ..services.user_cache import CachedUser, token_version_cache, user_cache
 
 router = APIRouter(tags=["Users"])
 
@@ -24,7 +30,6 @@ if not SECRET_KEY:
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
 security = HTTPBearer()
 
 # ===============================
@@ -50,18 +55,6 @@ class UserResponse(BaseModel):
         from_attributes = True
 
 
-# ===============================
-# PASSWORD UTILS
-# ===============================
-
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
-
 # ===============================
 # JWT
 # ===============================
@@ -77,30 +70,46 @@ def create_access_token(data: dict):
 # REGISTER
 # ===============================
 
-@router.post("/register")
-def register(user: UserCreate, db: Session = Depends(get_db)):
-
-    existing_username = db.query(User).filter(User.username == user.username).first()
-    if existing_username:
-        raise HTTPException(status_code=400, detail="Username already exists")
-
-    existing_email = db.query(User).filter(User.email == user.email).first()
-    if existing_email:
-        raise HTTPException(status_code=400, detail="Email already exists")
+def create_user(db: Session, user: UserCreate, password_hash: str) -> User:
 
     new_user = User(
         username=user.username,
         email=user.email,
-        password_hash=hash_password(user.password)
+        password_hash=password_hash,
+        standing=UserStanding(username=user.username)
     )
 
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    invalidate_on_commit(db, standings_cache)
+
+    # unikalnosc pilnuja indeksy ix_users_username / ix_users_email
+    try:
+        db.commit()
+    except IntegrityError as exc:
+        db.rollback()
+        # SQLite: "users.username", Postgres: nazwa indeksu "ix_users_username"
+        message = str(exc.orig)
 
-    # zapis do pliku (MVP only)
-    with open("email.txt", "a", encoding="utf-8") as f:
-        f.write(user.email + "\n")
+        if "users.username" in message or "ix_users_username" in message:
+            raise HTTPException(status_code=400, detail="Username already exists") from exc
+
+        if "users.email" in message or "ix_users_email" in message:
+            raise HTTPException(status_code=400, detail="Email already exists") from exc
+
+        raise
+
+    # zapis do pliku (MVP only), w tle
+    email_log.write(user.email)
+
+    return new_user
+
+
+@router.post("/register")
+async def register(user: UserCreate, db: Session = Depends(get_db)):
+
+    # hashowanie na osobnej puli, baza w threadpoolu FastAPI
+    password_hash = await hash_password_async(user.password)
+    await run_in_threadpool(create_user, db, user, password_hash)
 
     return {"message": "User created"}
 
@@ -110,17 +119,26 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
 # ===============================
 
 @router.post("/login")
-def login(user: UserLogin, db: Session = Depends(get_db)):
+async def login(user: UserLogin, db: Session = Depends(get_read_db)):
 
-    db_user = db.query(User).filter(User.username == user.username).first()
+    # sesja tylko do odczytu: weryfikacja Argon2 nie trzyma polaczenia writera
+    db_user = await run_in_threadpool(
+        lambda: db.query(User).filter(User.username == user.username).first()
+    )
 
-    if not db_user or not verify_password(user.password, db_user.password_hash):
+    if not db_user or not await verify_password_async(user.password, db_user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
         )
 
-    access_token = create_access_token({"sub": db_user.username})
+    access_token = create_access_token(
+        {
+            "sub": db_user.username,
+            "uid": db_user.id,
+            "ver": db_user.token_version,
+        }
+    )
 
     return {"access_token": access_token}
 
@@ -129,18 +147,12 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
 # CURRENT USER
 # ===============================
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-):
-
-    token = credentials.credentials
+def decode_access_token(token: str) -> dict:
 
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
 
-        if username is None:
+        if payload.get("sub") is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token"
@@ -152,15 +164,166 @@ def get_current_user(
             detail="Invalid token"
         )
 
-    user = db.query(User).filter(User.username == username).first()
+    return payload
+
+
+def ensure_token_version(payload: dict, current_version: int) -> None:
+    # tokeny sprzed wprowadzenia claimu "ver" traktujemy jak wersje 0
+    if payload.get("ver", 0) != current_version:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token revoked"
+        )
+
+
+# Kroki bez I/O, wspolne z wersjami async w routes/async_routes.py:
+# zaleznosci ponizej tylko pobieraja dane z bazy i skladaja te kroki.
+
+def token_version_statement(user_id: int):
+    return select(User.token_version).where(User.id == user_id)
+
 
+def user_by_username_statement(username: str):
+    return select(User).where(User.username == username)
+
+
+def remember_token_version(user_id: int, current_version: int | None) -> int:
+    """
+    Wersja tokena pobrana z bazy (None - brak uzytkownika) trafia do cache.
+    """
+    if current_version is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found"
+        )
+
+    token_version_cache.set(user_id, current_version)
+
+    return current_version
+
+
+def check_cached_principal(token: str, cached_user: CachedUser, current_version: int) -> CachedUser:
+    """
+    Trafienie w user_cache jest wazne, o ile token nie zostal w miedzyczasie
+    uniewazniony (np. /logout-all w innym procesie).
+    """
+    if current_version != cached_user.token_version:
+        user_cache.delete(token)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token revoked"
+        )
+
+    return cached_user
+
+
+def user_principal(token: str, payload: dict, user: User | None) -> CachedUser:
+    """
+    Principal z wiersza users (po nazwie z claimu sub).
+    """
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
 
-    return user
+    ensure_token_version(payload, user.token_version)
+    token_version_cache.set(user.id, user.token_version)
+
+    cached_user = CachedUser(
+        id=user.id,
+        username=user.username,
+        email=user.email,
+        token_version=user.token_version,
+    )
+    user_cache.set(token, cached_user, expires_at=payload.get("exp"))
+
+    return cached_user
+
+
+def claims_principal(token: str, payload: dict, current_version: int) -> CachedUser:
+    """
+    Principal z podpisanych claimow uid/sub, bez wiersza users.
+    """
+    ensure_token_version(payload, current_version)
+
+    principal = CachedUser(id=payload["uid"], username=payload["sub"], token_version=current_version)
+    user_cache.set(token, principal, expires_at=payload.get("exp"))
+
+    return principal
+
+
+def current_token_version(db: Session, user_id: int) -> int:
+    current_version = token_version_cache.get(user_id)
+
+    if current_version is None:
+        current_version = remember_token_version(user_id, db.scalar(token_version_statement(user_id)))
+
+    return current_version
+
+
+def cached_principal(db: Session, token: str) -> CachedUser | None:
+    cached_user = user_cache.get(token)
+
+    if cached_user is None:
+        return None
+
+    return check_cached_principal(token, cached_user, current_token_version(db, cached_user.id))
+
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> CachedUser:
+
+    token = credentials.credentials
+
+    cached_user = cached_principal(db, token)
+
+    if cached_user is not None:
+        return cached_user
+
+    payload = decode_access_token(token)
+
+    return user_principal(token, payload, db.scalar(user_by_username_statement(payload["sub"])))
+
+
+def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> CachedUser:
+    """
+    Dla endpointow tylko do odczytu: ufa podpisanym claimom uid/sub
+    i siega do bazy tylko po wersje tokena, gdy nie ma jej w cache.
+    """
+
+    token = credentials.credentials
+
+    cached_user = cached_principal(db, token)
+
+    if cached_user is not None:
+        return cached_user
+
+    payload = decode_access_token(token)
+    user_id = payload.get("uid")
+
+    if user_id is None:
+        return get_current_user(credentials, db)
+
+    return claims_principal(token, payload, current_token_version(db, user_id))
+
+
+@router.post("/logout-all")
+def logout_all(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+
+    user = db.query(User).filter(User.id == current_user.id).first()
+    user.token_version = (user.token_version or 0) + 1
+    db.commit()
+
+    return {"message": "All sessions revoked"}
 
 
 @router.get("/me", response_model=UserResponse)
@@ -0,0 +1,293 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+import json
+import threading
+from typing import TYPE_CHECKING, Awaitable, Callable, NamedTuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.database import dialect_insert
+from app.models import CacheVersion
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def encode_body(payload: object) -> bytes:
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False).encode("utf-8")
+
+
+class CacheState(NamedTuple):
+    version: int
+    # czas ostatniego podbicia (Last-Modified), None gdy jeszcze nie bylo
+    modified_at: datetime | None
+
+
+class VersionedCache:
+    """
+    Cache odpowiedzi w pamieci procesu, kluczowany wersja z tabeli
+    cache_versions. Wersje podbija transakcja zmieniajaca dane
+    (invalidate_on_commit), wiec zapis w jednym workerze albo w skrypcie
+    uniewaznia wpisy we wszystkich procesach.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        # najwyzsza wersja widziana w tym procesie
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._entries: dict[str, tuple[int, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def _state_statement(self):
+        return select(CacheVersion.version, CacheVersion.updated_at).where(CacheVersion.name == self.name)
+
+    @staticmethod
+    def _state(row) -> CacheState:
+        if row is None:
+            return CacheState(0, None)
+
+        modified_at = row.updated_at
+
+        # SQLite zwraca czas bez strefy
+        if modified_at.tzinfo is None:
+            modified_at = modified_at.replace(tzinfo=timezone.utc)
+
+        return CacheState(row.version, modified_at)
+
+    def current(self, db: Session) -> CacheState:
+        """
+        Aktualna wersja: jedno zapytanie po kluczu glownym.
+        """
+        return self._state(db.execute(self._state_statement()).first())
+
+    async def current_async(self, db: "AsyncSession") -> CacheState:
+        return self._state((await db.execute(self._state_statement())).first())
+
+    def bump(self, db: Session) -> None:
+        """
+        Podbija wersje w transakcji sesji db. Zwykle wolane przez
+        invalidate_on_commit tuz przed commit.
+        """
+        insert = dialect_insert(db)
+        statement = insert(CacheVersion).values(
+            name=self.name,
+            version=1,
+            updated_at=datetime.now(timezone.utc),
+        )
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[CacheVersion.name],
+                set_={
+                    "version": CacheVersion.version + 1,
+                    "updated_at": statement.excluded.updated_at,
+                },
+            )
+        )
+
+    def etag(self, key: str, state: CacheState) -> str:
+        return f'W/"{self.name}-{state.version}-{key}"'
+
+    @staticmethod
+    def last_modified(state: CacheState) -> str | None:
+        if state.modified_at is None:
+            return None
+
+        return format_datetime(state.modified_at.replace(microsecond=0), usegmt=True)
+
+    @staticmethod
+    def modified_since(state: CacheState, header: str) -> bool:
+        """
+        If-Modified-Since ma rozdzielczosc sekundy: zmiana w tej samej sekundzie
+        co naglowek liczy sie jako zmiana (lepiej 200 niz nieaktualne 304).
+        """
+        if state.modified_at is None:
+            return True
+
+        try:
+            since = parsedate_to_datetime(header)
+        except (TypeError, ValueError):
+            return True
+
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+
+        return int(state.modified_at.timestamp()) >= int(since.timestamp())
+
+    def get_or_build(self, db: Session, key: str, build: Callable[[], object]) -> bytes:
+        return self._get_or_build(key, self.current(db).version, build)
+
+    async def get_or_build_async(self, db: "AsyncSession", key: str, build: Callable[[], Awaitable[object]]) -> bytes:
+        return await self._get_or_build_async(key, (await self.current_async(db)).version, build)
+
+    def _get_or_build(self, key: str, version: int, build: Callable[[], object]) -> bytes:
+        body = self._lookup(key, version)
+
+        if body is None:
+            body = self._store(key, version, build())
+
+        return body
+
+    async def _get_or_build_async(self, key: str, version: int, build: Callable[[], Awaitable[object]]) -> bytes:
+        body = self._lookup(key, version)
+
+        if body is None:
+            body = self._store(key, version, await build())
+
+        return body
+
+    def _lookup(self, key: str, version: int) -> bytes | None:
+        if version > self.version:
+            # nowa wersja: stare wpisy nie beda juz trafione
+            with self._lock:
+                if version > self.version:
+                    self.version = version
+                    self._entries.clear()
+
+        entry = self._entries.get(key)
+
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        return None
+
+    def _store(self, key: str, version: int, payload: object) -> bytes:
+        body = encode_body(payload)
+
+        with self._lock:
+            # wpis zbudowany dla starej wersji nie trafia do cache
+            if self.version == version:
+                self._entries[key] = (version, body)
+
+        return body
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.not_modified
+
+        return {
+            "name": self.name,
+            "version": self.version,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "hit_rate": round((self.hits + self.not_modified) / lookups, 3) if lookups else None,
+        }
+
+
+standings_cache = VersionedCache("standings")
+# lista meczow z licznikami typow: mecze, wyniki i nowe typy
+matches_cache = VersionedCache("matches")
+# tylko wpisanie lub usuniecie wyniku zmienia projekcje turnieju
+projection_cache = VersionedCache("projection")
+
+
+def invalidate_on_commit(db: Session, cache: VersionedCache) -> None:
+    """
+    Podbija wersje cache w transakcji db, tuz przed commit: nowa wersja
+    staje sie widoczna dla innych procesow razem ze zmienionymi danymi.
+    """
+    db.info.setdefault("invalidate_caches", set()).add(cache)
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_before_commit(session: Session) -> None:
+    # stala kolejnosc wierszy cache_versions - bez zakleszczen w Postgresie
+    for cache in sorted(session.info.pop("invalidate_caches", ()), key=lambda cache: cache.name):
+        cache.bump(session)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop("invalidate_caches", None)
+
+
+def _not_modified(request: Request, cache: VersionedCache, key: str, state: CacheState) -> tuple[dict, Response | None]:
+    etag = cache.etag(key, state)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    last_modified = cache.last_modified(state)
+
+    if last_modified is not None:
+        headers["Last-Modified"] = last_modified
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+
+    # If-None-Match ma pierwszenstwo, If-Modified-Since tylko bez ETaga
+    if if_none_match is not None:
+        fresh = if_none_match == etag
+    else:
+        fresh = if_modified_since is not None and not cache.modified_since(state, if_modified_since)
+
+    if fresh:
+        cache.not_modified += 1
+        return headers, Response(status_code=304, headers=headers)
+
+    return headers, None
+
+
+def cached_response(
+    request: Request,
+    db: Session,
+    cache: VersionedCache,
+    key: str,
+    build: Callable[[], object],
+) -> Response:
+    state = cache.current(db)
+    headers, not_modified = _not_modified(request, cache, key, state)
+
+    if not_modified is not None:
+        return not_modified
+
+    return Response(
+        content=cache._get_or_build(key, state.version, build),
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+async def cached_response_async(
+    request: Request,
+    db: "AsyncSession",
+    cache: VersionedCache,
+    key: str,
+    build: Callable[[], Awaitable[object]],
+) -> Response:
+    state = await cache.current_async(db)
+    headers, not_modified = _not_modified(request, cache, key, state)
+
+    if not_modified is not None:
+        return not_modified
+
+    return Response(
+        content=await cache._get_or_build_async(key, state.version, build),
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+def versioned_response(
+    request: Request,
+    cache: VersionedCache,
+    key: str,
+    state: CacheState,
+    body: bytes,
+) -> Response:
+    """
+    Odpowiedz z gotowa trescia zbudowana dla wersji state (np. poprzedni
+    wynik, gdy nowy liczy sie w tle). ETag jest tej wersji, wiec klient
+    dostanie 200, gdy pojawi sie nowszy wynik.
+    """
+    headers, not_modified = _not_modified(request, cache, key, state)
+
+    if not_modified is not None:
+        return not_modified
+
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,82 @@
+import atexit
+import os
+import queue
+import threading
+import time
+
+
+class BufferedLineWriter:
+    """
+    Dopisuje linie do pliku z watku w tle. Request tylko wrzuca linie
+    do kolejki; watek zapisuje je paczkami i robi fsync co fsync_interval.
+    """
+
+    def __init__(self, path: str, fsync_interval: float = 1.0, batch_size: int = 256):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.batch_size = batch_size
+        self._queue: queue.Queue[str | None] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def write(self, line: str) -> None:
+        self._ensure_started()
+        self._queue.put(line)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                return
+
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="email-log", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        with open(self.path, "a", encoding="utf-8") as file:
+            last_sync = time.monotonic()
+            dirty = False
+            running = True
+
+            while running:
+                try:
+                    batch = [self._queue.get(timeout=self.fsync_interval)]
+                except queue.Empty:
+                    batch = []
+
+                while batch and len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                if None in batch:
+                    running = False
+
+                lines = [line for line in batch if line is not None]
+
+                if lines:
+                    file.write("".join(line + "\n" for line in lines))
+                    dirty = True
+
+                if dirty and (not running or time.monotonic() - last_sync >= self.fsync_interval):
+                    file.flush()
+                    os.fsync(file.fileno())
+                    last_sync = time.monotonic()
+                    dirty = False
+
+
+email_log = BufferedLineWriter(
+    path=os.getenv("EMAIL_LOG_PATH", "email.txt"),
+    fsync_interval=float(os.getenv("EMAIL_LOG_FSYNC_INTERVAL", "1.0")),
+)
+atexit.register(email_log.close)
@@ -4,7 +4,6 @@ from datetime import date
 from typing import Any
 from urllib.error import HTTPError, URLError
 from urllib.parse import urlencode
-from urllib.request import Request, urlopen
 import json
 
 
@@ -70,6 +69,9 @@ def fetch_finished_results(match_date: date | None = None) -> list[ExternalMatch
 
 
 def _fetch_fixtures_payload(match_date: date | None = None) -> dict[str, Any]:
+    # urllib.request (http.client, ssl) dopiero przy pierwszym zapytaniu do API
+    from urllib.request import Request, urlopen
+
     api_key = os.getenv("FOOTBALL_API_KEY")
 
     if not api_key:
@@ -0,0 +1,94 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import os
+import threading
+
+from fastapi import HTTPException, status
+
+
+def get_argon2_settings() -> dict:
+    """
+    Parametry Argon2 z env. Brak zmiennej = domyslna wartosc passlib,
+    istniejace hashe weryfikuja sie swoimi parametrami.
+    """
+    settings = {}
+
+    for env_name, option in (
+        ("ARGON2_TIME_COST", "argon2__rounds"),
+        ("ARGON2_MEMORY_COST", "argon2__memory_cost"),
+        ("ARGON2_PARALLELISM", "argon2__parallelism"),
+    ):
+        value = os.getenv(env_name)
+
+        if value:
+            settings[option] = int(value)
+
+    return settings
+
+
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
+HASH_RETRY_AFTER = os.getenv("PASSWORD_HASH_RETRY_AFTER", "2")
+
+# passlib/argon2 i pula watkow tworzone przy pierwszym uzyciu (szybszy start procesu)
+_pwd_context = None
+# argon2-cffi zwalnia GIL, wiec watki licza rownolegle
+_executor: ThreadPoolExecutor | None = None
+_init_lock = threading.Lock()
+# wykonywane + czekajace w kolejce
+_admission = threading.BoundedSemaphore(HASH_WORKERS + HASH_QUEUE_SIZE)
+
+
+def get_pwd_context():
+    global _pwd_context
+
+    if _pwd_context is None:
+        with _init_lock:
+            if _pwd_context is None:
+                from passlib.context import CryptContext
+
+                _pwd_context = CryptContext(schemes=["argon2"], deprecated="auto", **get_argon2_settings())
+
+    return _pwd_context
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+
+    if _executor is None:
+        with _init_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="argon2")
+
+    return _executor
+
+
+def hash_password(password: str) -> str:
+    return get_pwd_context().hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+
+async def _run_limited(function, *args):
+    if not _admission.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many login attempts, try again shortly",
+            headers={"Retry-After": HASH_RETRY_AFTER},
+        )
+
+    # miejsce zwalnia dopiero koniec obliczen, nawet gdy klient sie rozlaczy
+    future = _get_executor().submit(function, *args)
+    future.add_done_callback(lambda _: _admission.release())
+
+    return await asyncio.wrap_future(future)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_limited(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_limited(verify_password, plain_password, hashed_password)
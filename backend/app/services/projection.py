@@ -0,0 +1,293 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import logging
+import os
+import threading
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.database import ReadSessionLocal
+from app.models import Match, Prediction
+from app.services.cache import CacheState, encode_body
+from app.services.what_if import load_standings_arrays, rank_positions, score_predictions
+
+logger = logging.getLogger(__name__)
+
+# wyniki i typy w symulacji (gole z rozkladu Poissona, typy 0..20)
+SCORE_DTYPE = np.int16
+# szczyt pamieci simulate_shard na element macierzy (symulacje x typy) i (symulacje x uzytkownicy),
+# zmierzony dla SCORE_DTYPE z zapasem
+BYTES_PER_PREDICTION = 16
+BYTES_PER_USER = 96
+
+
+@dataclass
+class ProjectionConfig:
+    runs: int
+    home_goals: float
+    away_goals: float
+    workers: int
+    # None = z budzetu pamieci (memory_mb na proces)
+    batch_size: int | None
+    memory_mb: int
+    max_positions: int
+
+
+def get_projection_config() -> ProjectionConfig:
+    batch_size = os.getenv("PROJECTION_BATCH_SIZE")
+
+    return ProjectionConfig(
+        runs=int(os.getenv("PROJECTION_RUNS", "100000")),
+        home_goals=float(os.getenv("PROJECTION_HOME_GOALS", "1.45")),
+        away_goals=float(os.getenv("PROJECTION_AWAY_GOALS", "1.15")),
+        # kazdy worker uvicorna ma wlasna pule, domyslnie najwyzej 2 procesy
+        workers=int(os.getenv("PROJECTION_WORKERS", str(min(2, os.cpu_count() or 1)))),
+        batch_size=int(batch_size) if batch_size else None,
+        memory_mb=int(os.getenv("PROJECTION_MEMORY_MB", "128")),
+        max_positions=int(os.getenv("PROJECTION_MAX_POSITIONS", "20")),
+    )
+
+
+def batch_size_for(config: ProjectionConfig, predictions: int, users: int) -> int:
+    """
+    Liczba symulacji w paczce tak, zeby jedna paczka miescila sie w memory_mb.
+    """
+    if config.batch_size:
+        return config.batch_size
+
+    per_run = predictions * BYTES_PER_PREDICTION + users * BYTES_PER_USER
+    return max(1, min(config.runs, config.memory_mb * 1024 * 1024 // max(per_run, 1)))
+
+
+@dataclass
+class ProjectionInput:
+    """
+    Dane wejsciowe symulacji jako tablice, zeby dalo sie je
+    przeslac do procesow roboczych bez ORM.
+    """
+    base_points: np.ndarray
+    base_exact: np.ndarray
+    username_order: np.ndarray
+    matches_count: int
+    # typy posortowane po uzytkowniku, pod np.add.reduceat
+    match_index: np.ndarray
+    predicted_home: np.ndarray
+    predicted_away: np.ndarray
+    user_starts: np.ndarray
+    user_columns: np.ndarray
+    home_goals: float
+    away_goals: float
+    batch_size: int
+    max_positions: int
+
+
+def load_projection_input(db: Session, config: ProjectionConfig) -> tuple[ProjectionInput, list[int], list[str]]:
+    standings = load_standings_arrays(db)
+    user_index = standings.index_of()
+
+    match_ids = [
+        row.id
+        for row in db.query(Match.id)
+        .filter(Match.is_finished.isnot(True))
+        .order_by(Match.id)
+        .all()
+    ]
+    match_index = {match_id: index for index, match_id in enumerate(match_ids)}
+
+    predictions = sorted(
+        (
+            (user_index[row.user_id], match_index[row.match_id], row.home_score, row.away_score)
+            for row in db.query(
+                Prediction.user_id,
+                Prediction.match_id,
+                Prediction.home_score,
+                Prediction.away_score,
+            )
+            .filter(Prediction.match_id.in_(match_ids))
+            .all()
+            if row.user_id in user_index
+        ),
+    )
+
+    columns = np.array([row[0] for row in predictions], dtype=np.int64)
+    user_columns, user_starts = np.unique(columns, return_index=True)
+
+    data = ProjectionInput(
+        base_points=standings.points,
+        base_exact=standings.exact,
+        username_order=standings.username_order,
+        matches_count=len(match_ids),
+        match_index=np.array([row[1] for row in predictions], dtype=np.int64),
+        predicted_home=np.array([row[2] for row in predictions], dtype=SCORE_DTYPE),
+        predicted_away=np.array([row[3] for row in predictions], dtype=SCORE_DTYPE),
+        user_starts=user_starts,
+        user_columns=user_columns,
+        home_goals=config.home_goals,
+        away_goals=config.away_goals,
+        batch_size=batch_size_for(config, len(predictions), len(standings.user_ids)),
+        max_positions=min(config.max_positions, len(standings.user_ids)),
+    )
+
+    return data, standings.user_ids.tolist(), standings.usernames
+
+
+def simulate_shard(data: ProjectionInput, runs: int, seed: np.random.SeedSequence) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Symuluje runs turniejow. Zwraca licznik pozycji 1..max_positions
+    dla kazdego uzytkownika oraz sume pozycji (do sredniej).
+    """
+    rng = np.random.default_rng(seed)
+    users = len(data.base_points)
+    position_counts = np.zeros((users, data.max_positions), dtype=np.int64)
+    position_sums = np.zeros(users, dtype=np.int64)
+
+    for start in range(0, runs, data.batch_size):
+        batch = min(data.batch_size, runs - start)
+        points = np.tile(data.base_points, (batch, 1))
+        exact = np.tile(data.base_exact, (batch, 1))
+
+        if len(data.match_index):
+            home = rng.poisson(data.home_goals, (batch, data.matches_count)).astype(SCORE_DTYPE)
+            away = rng.poisson(data.away_goals, (batch, data.matches_count)).astype(SCORE_DTYPE)
+            prediction_points, prediction_exact = score_predictions(
+                data.predicted_home,
+                data.predicted_away,
+                home[:, data.match_index],
+                away[:, data.match_index],
+            )
+            points[:, data.user_columns] += np.add.reduceat(
+                prediction_points, data.user_starts, axis=1, dtype=np.int64
+            )
+            exact[:, data.user_columns] += np.add.reduceat(
+                prediction_exact, data.user_starts, axis=1, dtype=np.int64
+            )
+
+        positions = rank_positions(points, exact, data.username_order)
+        position_sums += positions.sum(axis=0)
+
+        top = positions <= data.max_positions
+        user_columns = np.broadcast_to(np.arange(users), positions.shape)[top]
+        position_counts += np.bincount(
+            user_columns * data.max_positions + positions[top] - 1,
+            minlength=users * data.max_positions,
+        ).reshape(users, data.max_positions)
+
+    return position_counts, position_sums
+
+
+_executor: ProcessPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(workers: int) -> ProcessPoolExecutor:
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=workers)
+
+        return _executor
+
+
+def run_projection(data: ProjectionInput, config: ProjectionConfig) -> tuple[np.ndarray, np.ndarray]:
+    shards = max(1, min(config.workers, config.runs // data.batch_size or 1))
+    seeds = np.random.SeedSequence().spawn(shards)
+    shard_runs = [config.runs // shards + (1 if index < config.runs % shards else 0) for index in range(shards)]
+
+    if shards == 1:
+        return simulate_shard(data, shard_runs[0], seeds[0])
+
+    executor = _get_executor(config.workers)
+    results = list(executor.map(simulate_shard, [data] * shards, shard_runs, seeds))
+
+    return (
+        sum(result[0] for result in results),
+        sum(result[1] for result in results),
+    )
+
+
+def project_final_standings(db: Session, config: ProjectionConfig | None = None) -> dict:
+    config = config or get_projection_config()
+    data, user_ids, usernames = load_projection_input(db, config)
+
+    if not user_ids:
+        return {"runs": 0, "remaining_matches": data.matches_count, "users": []}
+
+    position_counts, position_sums = run_projection(data, config)
+    probabilities = position_counts / config.runs
+
+    users = [
+        {
+            "user_id": user_ids[index],
+            "username": usernames[index],
+            "expected_position": round(float(position_sums[index]) / config.runs, 2),
+            "win_probability": round(float(probabilities[index, 0]), 4),
+            "position_probabilities": [round(float(value), 4) for value in probabilities[index]],
+        }
+        for index in range(len(user_ids))
+    ]
+
+    return {
+        "runs": config.runs,
+        "remaining_matches": data.matches_count,
+        "home_goals": config.home_goals,
+        "away_goals": config.away_goals,
+        "users": sorted(users, key=lambda item: (item["expected_position"], item["username"] or "")),
+    }
+
+
+class ProjectionJob:
+    """
+    Jedno liczenie projekcji naraz w procesie. Gdy wynik jest starszy niz
+    wersja projection_cache, liczy nowy w tle, a zapytania dostaja poprzedni
+    wynik z jego wersja. Czekaja tylko, gdy nie ma jeszcze zadnego wyniku.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._result: tuple[CacheState, bytes] | None = None
+        self._running = False
+        self._error: Exception | None = None
+
+    def get(self, state: CacheState) -> tuple[CacheState, bytes]:
+        with self._condition:
+            if (self._result is None or self._result[0].version < state.version) and not self._running:
+                self._running = True
+                self._error = None
+                threading.Thread(target=self._run, args=(state,), name="projection", daemon=True).start()
+
+            while self._result is None:
+                if self._error is not None and not self._running:
+                    raise self._error
+
+                self._condition.wait()
+
+            return self._result
+
+    def _run(self, state: CacheState) -> None:
+        try:
+            db = ReadSessionLocal()
+
+            try:
+                body = encode_body(project_final_standings(db))
+            finally:
+                db.close()
+        except Exception as error:
+            logger.exception("Projection failed")
+
+            with self._condition:
+                self._error = error
+                self._running = False
+                self._condition.notify_all()
+            return
+
+        with self._condition:
+            if self._result is None or self._result[0].version <= state.version:
+                self._result = (state, body)
+
+            self._running = False
+            self._condition.notify_all()
+
+
+projection_job = ProjectionJob()
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from app.models import Match, Prediction, User, UserStanding
+from app.services.standings import rebuild_standings
+
+
+def seed_sample_data(
+    db: Session,
+    users: int,
+    matches: int,
+    start: datetime,
+    spacing: timedelta = timedelta(hours=1),
+    prefix: str = "sample",
+) -> tuple[list[int], list[int]]:
+    """
+    Dane testowe dla benchmarkow i testow: uzytkownicy {prefix}N (bez hasla),
+    mecze "Team N" - "Team N+1" co spacing od start i typ kazdego uzytkownika
+    na kazdy mecz, plus przeliczony user_standings. Commit po stronie wolajacego.
+    Zwraca (id uzytkownikow, id meczow) w kolejnosci tworzenia.
+    """
+    user_rows = [
+        User(
+            username=f"{prefix}{index}",
+            email=f"{prefix}{index}@example.com",
+            password_hash="-",
+            standing=UserStanding(username=f"{prefix}{index}"),
+        )
+        for index in range(users)
+    ]
+    match_rows = [
+        Match(
+            home_team=f"Team {index}",
+            away_team=f"Team {index + 1}",
+            start_time=start + spacing * index,
+            stage="group",
+        )
+        for index in range(matches)
+    ]
+    db.add_all(user_rows)
+    db.add_all(match_rows)
+    db.flush()
+
+    user_ids = [user.id for user in user_rows]
+    match_ids = [match.id for match in match_rows]
+    db.add_all(
+        Prediction(user_id=user_id, match_id=match_id, home_score=user_id % 4, away_score=match_id % 3)
+        for user_id in user_ids
+        for match_id in match_ids
+    )
+    rebuild_standings(db)
+
+    return user_ids, match_ids
@@ -1,6 +1,13 @@
+from sqlalchemy import case
 from sqlalchemy.orm import Session
 
 from app.models import Match, Prediction
+from app.services.cache import invalidate_on_commit, matches_cache, projection_cache
+from app.services.standings import (
+    add_match_result,
+    refresh_snapshots,
+    remove_match_result,
+)
 
 
 def calculate_points(prediction: Prediction, match: Match) -> int:
@@ -20,27 +27,68 @@ def calculate_points(prediction: Prediction, match: Match) -> int:
     return 0
 
 
+def points_expression(home_score: int, away_score: int):
+    """
+    SQL-owy odpowiednik calculate_points dla znanego wyniku meczu.
+    """
+    if home_score > away_score:
+        correct_outcome = Prediction.home_score > Prediction.away_score
+    elif home_score < away_score:
+        correct_outcome = Prediction.home_score < Prediction.away_score
+    else:
+        correct_outcome = Prediction.home_score == Prediction.away_score
+
+    return case(
+        (
+            (Prediction.home_score == home_score) & (Prediction.away_score == away_score),
+            2,
+        ),
+        (correct_outcome, 1),
+        else_=0,
+    )
+
+
 def set_final_result(db: Session, match: Match, home_score: int, away_score: int) -> int:
+    remove_match_result(db, match)
+    invalidate_on_commit(db, projection_cache)
+    invalidate_on_commit(db, matches_cache)
+
     match.home_score = home_score
     match.away_score = away_score
     match.is_finished = True
 
-    predictions = db.query(Prediction).filter(Prediction.match_id == match.id).all()
+    predictions_updated = (
+        db.query(Prediction)
+        .filter(Prediction.match_id == match.id)
+        .update(
+            {Prediction.points: points_expression(home_score, away_score)},
+            synchronize_session=False,
+        )
+    )
 
-    for prediction in predictions:
-        prediction.points = calculate_points(prediction, match)
+    db.flush()
+    add_match_result(db, match)
+    refresh_snapshots(db, match)
 
-    return len(predictions)
+    return predictions_updated
 
 
 def clear_final_result(db: Session, match: Match) -> int:
+    remove_match_result(db, match)
+    invalidate_on_commit(db, projection_cache)
+    invalidate_on_commit(db, matches_cache)
+
     match.home_score = None
     match.away_score = None
     match.is_finished = False
 
-    predictions = db.query(Prediction).filter(Prediction.match_id == match.id).all()
+    predictions_updated = (
+        db.query(Prediction)
+        .filter(Prediction.match_id == match.id)
+        .update({Prediction.points: 0}, synchronize_session=False)
+    )
 
-    for prediction in predictions:
-        prediction.points = 0
+    db.flush()
+    refresh_snapshots(db, match)
 
-    return len(predictions)
+    return predictions_updated
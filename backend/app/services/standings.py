@@ -0,0 +1,342 @@
+from array import array
+from datetime import datetime
+from bisect import bisect_left
+from typing import Iterable
+import sys
+
+from sqlalchemy import and_, case, delete, func, insert, literal, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.models import Match, Prediction, StandingsSnapshot, User, UserStanding
+from app.services.cache import invalidate_on_commit, standings_cache
+
+
+# Ta sama kolejnosc co indeks ix_user_standings_order
+LEADERBOARD_ORDER = (
+    UserStanding.total_points.desc(),
+    UserStanding.exact_score_count.desc(),
+    UserStanding.username.asc(),
+)
+
+# Ta sama kolejnosc co indeks ix_user_standings_beers_order
+BEER_LEADERBOARD_ORDER = (
+    UserStanding.beers.desc(),
+    UserStanding.username.asc(),
+)
+
+
+def leaderboard_rank(db: Session, standing: UserStanding) -> int:
+    """
+    Pozycja w rankingu liczona zakresowo po indeksie, bez pelnego sortowania.
+    """
+    ahead = (
+        db.query(func.count(UserStanding.user_id))
+        .filter(
+            or_(
+                UserStanding.total_points > standing.total_points,
+                and_(
+                    UserStanding.total_points == standing.total_points,
+                    UserStanding.exact_score_count > standing.exact_score_count,
+                ),
+                and_(
+                    UserStanding.total_points == standing.total_points,
+                    UserStanding.exact_score_count == standing.exact_score_count,
+                    UserStanding.username < standing.username,
+                ),
+            )
+        )
+        .scalar()
+    )
+
+    return ahead + 1
+
+
+def _apply_match(
+    db: Session,
+    match: Match,
+    sign: int,
+    user_id: int | None = None,
+    include_beers: bool = False,
+) -> None:
+    predictions = select(Prediction.user_id).where(Prediction.match_id == match.id)
+
+    if user_id is not None:
+        predictions = predictions.where(Prediction.user_id == user_id)
+
+    def per_user(expression):
+        return (
+            select(expression)
+            .where(
+                Prediction.match_id == match.id,
+                Prediction.user_id == UserStanding.user_id,
+            )
+            .scalar_subquery()
+        )
+
+    values = {}
+
+    if match.is_finished:
+        exact_score = case(
+            (
+                (Prediction.home_score == match.home_score)
+                & (Prediction.away_score == match.away_score),
+                1,
+            ),
+            else_=0,
+        )
+        values["total_points"] = UserStanding.total_points + sign * per_user(
+            func.coalesce(Prediction.points, 0)
+        )
+        values["settled_count"] = UserStanding.settled_count + literal(sign)
+        values["exact_score_count"] = UserStanding.exact_score_count + sign * per_user(exact_score)
+
+    if include_beers:
+        values["beers"] = UserStanding.beers + sign * per_user(
+            func.coalesce(Prediction.beers_count, 0)
+        )
+
+    if not values:
+        return
+
+    invalidate_on_commit(db, standings_cache)
+    db.execute(
+        update(UserStanding)
+        .where(UserStanding.user_id.in_(predictions))
+        .values(values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def remove_match_result(db: Session, match: Match, user_id: int | None = None) -> None:
+    """
+    Odejmuje wklad meczu od rankingu. Wywolywac przed zmiana wyniku,
+    gdy match i punkty typow maja jeszcze stare wartosci.
+    """
+    _apply_match(db, match, -1, user_id=user_id)
+
+
+def add_match_result(db: Session, match: Match, user_id: int | None = None) -> None:
+    """
+    Dodaje wklad meczu do rankingu. Wywolywac po zmianie wyniku
+    i po db.flush(), zeby SQL widzial nowe punkty typow.
+    """
+    _apply_match(db, match, 1, user_id=user_id)
+
+
+def remove_match(db: Session, match: Match) -> None:
+    _apply_match(db, match, -1, include_beers=True)
+
+
+def add_beers(db: Session, user_id: int, delta: int) -> None:
+    if not delta:
+        return
+
+    invalidate_on_commit(db, standings_cache)
+    db.execute(
+        update(UserStanding)
+        .where(UserStanding.user_id == user_id)
+        .values(beers=UserStanding.beers + delta)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def rebuild_standings(db: Session) -> int:
+    """
+    Pelne przeliczenie tabeli user_standings z predictions i matches.
+    """
+    exact_score_count = func.coalesce(
+        func.sum(
+            case(
+                (
+                    (Match.is_finished.is_(True))
+                    & (Prediction.home_score == Match.home_score)
+                    & (Prediction.away_score == Match.away_score),
+                    1,
+                ),
+                else_=0,
+            )
+        ),
+        0,
+    )
+
+    aggregated = (
+        select(
+            User.id,
+            User.username,
+            func.coalesce(func.sum(Prediction.points), 0),
+            func.count(Match.id).filter(Match.is_finished.is_(True)),
+            exact_score_count,
+            func.coalesce(func.sum(Prediction.beers_count), 0),
+        )
+        .outerjoin(Prediction, Prediction.user_id == User.id)
+        .outerjoin(Match, Match.id == Prediction.match_id)
+        .group_by(User.id, User.username)
+    )
+
+    invalidate_on_commit(db, standings_cache)
+    db.execute(delete(UserStanding))
+    db.execute(
+        insert(UserStanding).from_select(
+            [
+                UserStanding.user_id,
+                UserStanding.username,
+                UserStanding.total_points,
+                UserStanding.settled_count,
+                UserStanding.exact_score_count,
+                UserStanding.beers,
+            ],
+            aggregated,
+        )
+    )
+
+    return db.query(func.count(UserStanding.user_id)).scalar()
+
+
+def pack_standings(rows: Iterable[tuple[int, int, int]]) -> bytes:
+    """
+    Pakuje trojki (user_id, pozycja, punkty) do int32 little-endian,
+    posortowane po user_id, zeby dalo sie je przeszukiwac binarnie.
+    """
+    values = array("i")
+
+    for row in sorted(rows):
+        values.extend(row)
+
+    if sys.byteorder == "big":
+        values.byteswap()
+
+    return values.tobytes()
+
+
+def unpack_standings(data: bytes) -> array:
+    values = array("i")
+    values.frombytes(data)
+
+    if sys.byteorder == "big":
+        values.byteswap()
+
+    return values
+
+
+def snapshot_entry(values: array, user_id: int) -> tuple[int, int] | None:
+    user_ids = values[0::3]
+    index = bisect_left(user_ids, user_id)
+
+    if index == len(user_ids) or user_ids[index] != user_id:
+        return None
+
+    return values[index * 3 + 1], values[index * 3 + 2]
+
+
+def refresh_snapshots(db: Session, match: Match) -> int:
+    """
+    Przelicza snapshoty rankingu od tego meczu w kolejnosci (start_time, id):
+    kazdy liczony z typow na zakonczonych meczach do danego meczu wlacznie.
+    Wolac po db.flush() przy wpisaniu, korekcie lub usunieciu wyniku
+    i przy usuwaniu meczu - pozniejsze snapshoty zawieraja jego punkty.
+    Zwraca liczbe zapisanych snapshotow.
+    """
+    return refresh_snapshots_from(db, match.start_time, match.id)
+
+
+def refresh_snapshots_from(db: Session, start_time: datetime, match_id: int) -> int:
+    """
+    refresh_snapshots od pozycji (start_time, match_id) w kolejnosci meczow,
+    np. dawnej pozycji meczu, ktoremu zmienil sie start_time.
+    """
+    from_match = or_(
+        Match.start_time > start_time,
+        and_(Match.start_time == start_time, Match.id >= match_id),
+    )
+    finished = Match.is_finished.is_(True)
+    exact_score = case(
+        (
+            (Prediction.home_score == Match.home_score)
+            & (Prediction.away_score == Match.away_score),
+            1,
+        ),
+        else_=0,
+    )
+
+    invalidate_on_commit(db, standings_cache)
+    db.execute(
+        delete(StandingsSnapshot)
+        .where(StandingsSnapshot.match_id.in_(select(Match.id).where(from_match)))
+        .execution_options(synchronize_session=False)
+    )
+
+    match_ids = db.scalars(
+        select(Match.id).where(finished, from_match).order_by(Match.start_time.asc(), Match.id.asc())
+    ).all()
+
+    if not match_ids:
+        return 0
+
+    usernames = dict(db.execute(select(UserStanding.user_id, UserStanding.username)).all())
+    # user_id -> [punkty, dokladne wyniki] przed pierwszym przeliczanym meczem
+    totals = {user_id: [0, 0] for user_id in usernames}
+
+    for user_id, points, exact in db.execute(
+        select(
+            Prediction.user_id,
+            func.coalesce(func.sum(Prediction.points), 0),
+            func.coalesce(func.sum(exact_score), 0),
+        )
+        .join(Match, Match.id == Prediction.match_id)
+        .where(finished, ~from_match)
+        .group_by(Prediction.user_id)
+    ):
+        if user_id in totals:
+            totals[user_id] = [points, exact]
+
+    match_predictions: dict[int, list[tuple[int, int, int]]] = {match_id: [] for match_id in match_ids}
+
+    for match_id, user_id, points, exact in db.execute(
+        select(Prediction.match_id, Prediction.user_id, func.coalesce(Prediction.points, 0), exact_score)
+        .join(Match, Match.id == Prediction.match_id)
+        .where(finished, from_match)
+    ):
+        match_predictions[match_id].append((user_id, points, exact))
+
+    snapshots = []
+
+    for match_id in match_ids:
+        for user_id, points, exact in match_predictions[match_id]:
+            if user_id in totals:
+                totals[user_id][0] += points
+                totals[user_id][1] += exact
+
+        # ta sama kolejnosc co LEADERBOARD_ORDER
+        ranking = sorted(
+            totals,
+            key=lambda user_id: (-totals[user_id][0], -totals[user_id][1], usernames[user_id] or ""),
+        )
+        snapshots.append(
+            {
+                "match_id": match_id,
+                "users_count": len(ranking),
+                "data": pack_standings(
+                    (user_id, index + 1, totals[user_id][0])
+                    for index, user_id in enumerate(ranking)
+                ),
+            }
+        )
+
+    db.execute(insert(StandingsSnapshot), snapshots)
+
+    return len(snapshots)
+
+
+def rebuild_snapshots(db: Session) -> int:
+    """
+    Pelne przeliczenie standings_snapshots od pierwszego meczu (naprawa
+    i bazy z wynikami sprzed snapshotow). Zwraca liczbe snapshotow.
+    """
+    first_match = db.scalars(select(Match).order_by(Match.start_time.asc(), Match.id.asc()).limit(1)).first()
+
+    if first_match is None:
+        invalidate_on_commit(db, standings_cache)
+        db.execute(delete(StandingsSnapshot))
+        return 0
+
+    return refresh_snapshots(db, first_match)
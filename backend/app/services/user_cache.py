@@ -0,0 +1,139 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+import os
+import threading
+import time
+from typing import Any, Callable, Hashable
+
+from sqlalchemy import event, inspect
+
+from app.models import User
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    """
+    Lekka kopia uzytkownika zwracana przez get_current_user
+    i get_current_principal, niezwiazana z sesja bazy.
+    token_version to claim "ver" tokenu, sprawdzany przy kazdym trafieniu.
+    """
+    id: int
+    username: str
+    email: str | None = None
+    token_version: int = 0
+
+
+class LRUTTLCache:
+    """
+    LRU z TTL w pamieci procesu, z licznikami trafien.
+    """
+
+    def __init__(self, name: str, max_size: int, ttl_seconds: float):
+        self.name = name
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any | None:
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, expires_at: float | None = None) -> None:
+        """
+        expires_at to unix timestamp (np. claim exp), wpis go nie przezyje.
+        """
+        ttl = self.ttl_seconds
+
+        if expires_at is not None:
+            ttl = min(ttl, expires_at - time.time())
+
+        if ttl <= 0 or self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_where(self, predicate: Callable[[Any], bool]) -> None:
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if predicate(entry[1])]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+
+# token JWT -> CachedUser; token jest sprawdzany (podpis, exp) tylko przy pierwszym uzyciu
+user_cache = LRUTTLCache(
+    "token-user",
+    max_size=int(os.getenv("USER_CACHE_SIZE", "2048")),
+    ttl_seconds=float(os.getenv("USER_CACHE_TTL", "300")),
+)
+
+# user_id -> aktualny users.token_version; krotki TTL ogranicza opoznienie
+# uniewaznienia tokenow miedzy procesami (takze dla trafien w user_cache)
+token_version_cache = LRUTTLCache(
+    "token-version",
+    max_size=int(os.getenv("TOKEN_VERSION_CACHE_SIZE", "4096")),
+    ttl_seconds=float(os.getenv("TOKEN_VERSION_CACHE_TTL", "60")),
+)
+
+
+def invalidate_user(user_id: int) -> None:
+    user_cache.delete_where(lambda user: user.id == user_id)
+    token_version_cache.delete(user_id)
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_deleted_user(mapper, connection, target: User) -> None:
+    invalidate_user(target.id)
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_changed_user(mapper, connection, target: User) -> None:
+    state = inspect(target)
+
+    if any(
+        state.attrs[name].history.has_changes()
+        for name in ("username", "email", "token_version")
+    ):
+        invalidate_user(target.id)
@@ -0,0 +1,190 @@
+from dataclasses import dataclass
+import os
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models import Match, Prediction, UserStanding
+from app.services.user_cache import LRUTTLCache
+
+
+def score_predictions(
+    predicted_home: np.ndarray,
+    predicted_away: np.ndarray,
+    home: np.ndarray,
+    away: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Wektorowy odpowiednik services.scoring.calculate_points.
+    Zwraca punkty i trafienia dokladne (int8) z broadcastem po wejsciach.
+    """
+    exact = (predicted_home == home) & (predicted_away == away)
+    outcome = np.sign(predicted_home - predicted_away) == np.sign(home - away)
+    # dokladny wynik to tez trafiony rezultat: 2 = 1 + 1
+    points = outcome.astype(np.int8) + exact
+
+    return points, exact.astype(np.int8)
+
+
+def rank_positions(points: np.ndarray, exact: np.ndarray, username_order: np.ndarray) -> np.ndarray:
+    """
+    Pozycje w rankingu dla kazdego wiersza (punkty malejaco,
+    dokladne malejaco, nazwa rosnaco), numerowane od 1.
+    """
+    users = points.shape[-1]
+    exact_span = int(exact.max(initial=0)) + 1
+    sort_key = -(points * exact_span + exact) * users + username_order
+    order = np.argsort(sort_key, axis=-1, kind="stable")
+    positions = np.empty_like(order)
+    np.put_along_axis(positions, order, np.broadcast_to(np.arange(1, users + 1), order.shape), axis=-1)
+
+    return positions
+
+
+@dataclass
+class StandingsArrays:
+    user_ids: np.ndarray
+    usernames: list[str]
+    points: np.ndarray
+    exact: np.ndarray
+    username_order: np.ndarray
+
+    def index_of(self) -> dict[int, int]:
+        return {user_id: index for index, user_id in enumerate(self.user_ids.tolist())}
+
+
+def load_standings_arrays(db: Session) -> StandingsArrays:
+    standings = db.query(
+        UserStanding.user_id,
+        UserStanding.username,
+        UserStanding.total_points,
+        UserStanding.exact_score_count,
+    ).all()
+    usernames = [row.username for row in standings]
+
+    # kolejnosc alfabetyczna jako ostatnie kryterium remisu
+    username_order = np.empty(len(standings), dtype=np.int64)
+    username_order[
+        sorted(range(len(standings)), key=lambda index: usernames[index] or "")
+    ] = np.arange(len(standings))
+
+    return StandingsArrays(
+        user_ids=np.array([row.user_id for row in standings], dtype=np.int64),
+        usernames=usernames,
+        points=np.array([row.total_points for row in standings], dtype=np.int64),
+        exact=np.array([row.exact_score_count for row in standings], dtype=np.int64),
+        username_order=username_order,
+    )
+
+
+@dataclass
+class WhatIfGrid:
+    """
+    Ranking dla kazdego wyniku z siatki: wiersz to scenariusz,
+    kolumna to uzytkownik. Nie zalezy od tego, kto pyta.
+    """
+    user_ids: list[int]
+    usernames: list[str]
+    home_scores: np.ndarray
+    away_scores: np.ndarray
+    points: np.ndarray
+    positions: np.ndarray
+    # indeksy uzytkownikow w kolejnosci pozycji, per scenariusz
+    leaders: np.ndarray
+
+    def user_index(self, user_id: int) -> int | None:
+        try:
+            return self.user_ids.index(user_id)
+        except ValueError:
+            return None
+
+
+class WhatIfEngine:
+    """
+    Przelicza ranking dla wszystkich wynikow z siatki 0..max_goals
+    naraz. Wiersz macierzy to scenariusz, kolumna to uzytkownik.
+    """
+
+    def __init__(self, db: Session, match: Match):
+        standings = load_standings_arrays(db)
+        predictions = db.query(
+            Prediction.user_id,
+            Prediction.home_score,
+            Prediction.away_score,
+            Prediction.points,
+        ).filter(Prediction.match_id == match.id).all()
+
+        self.user_ids = standings.user_ids
+        self.usernames = standings.usernames
+        self.base_points = standings.points
+        self.base_exact = standings.exact
+        self.username_order = standings.username_order
+
+        user_index = standings.index_of()
+        predictions = [row for row in predictions if row.user_id in user_index]
+
+        self.predictor_index = np.array([user_index[row.user_id] for row in predictions], dtype=np.int64)
+        self.predicted_home = np.array([row.home_score for row in predictions], dtype=np.int64)
+        self.predicted_away = np.array([row.away_score for row in predictions], dtype=np.int64)
+
+        if match.is_finished:
+            # rozliczony mecz: odejmujemy jego obecny wklad od bazy
+            current_points = np.array([row.points or 0 for row in predictions], dtype=np.int64)
+            current_exact = (
+                (self.predicted_home == match.home_score) & (self.predicted_away == match.away_score)
+            ).astype(np.int64)
+            np.subtract.at(self.base_points, self.predictor_index, current_points)
+            np.subtract.at(self.base_exact, self.predictor_index, current_exact)
+
+    def project(self, max_goals: int) -> WhatIfGrid:
+        grid_home, grid_away = np.meshgrid(
+            np.arange(max_goals + 1), np.arange(max_goals + 1), indexing="ij"
+        )
+        home_scores = grid_home.ravel()
+        away_scores = grid_away.ravel()
+        scenarios = len(home_scores)
+
+        prediction_points, prediction_exact = score_predictions(
+            self.predicted_home,
+            self.predicted_away,
+            home_scores[:, None],
+            away_scores[:, None],
+        )
+
+        # uq_predictions_user_match: jeden typ na uzytkownika, indeksy sie nie powtarzaja
+        points = np.tile(self.base_points, (scenarios, 1))
+        exact = np.tile(self.base_exact, (scenarios, 1))
+        points[:, self.predictor_index] += prediction_points
+        exact[:, self.predictor_index] += prediction_exact
+
+        positions = rank_positions(points, exact, self.username_order)
+
+        return WhatIfGrid(
+            user_ids=self.user_ids.tolist(),
+            usernames=self.usernames,
+            home_scores=home_scores,
+            away_scores=away_scores,
+            points=points,
+            positions=positions,
+            leaders=positions.argsort(axis=1),
+        )
+
+
+# (match_id, max_goals, wersja standings_cache) -> WhatIfGrid, wspolne dla wszystkich
+# ogladajacych; wersja w kluczu uniewaznia siatke po zmianie rankingu
+what_if_cache = LRUTTLCache(
+    "what-if",
+    max_size=int(os.getenv("WHAT_IF_CACHE_SIZE", "64")),
+    ttl_seconds=float(os.getenv("WHAT_IF_CACHE_TTL", "600")),
+)
+
+
+def get_what_if_grid(db: Session, match: Match, max_goals: int, version: int) -> WhatIfGrid:
+    key = (match.id, max_goals, version)
+    grid = what_if_cache.get(key)
+
+    if grid is None:
+        grid = WhatIfEngine(db, match).project(max_goals)
+        what_if_cache.set(key, grid)
+
+    return grid
@@ -0,0 +1,91 @@
+# bench_db_modes.py
+# Porownanie trybu synchronicznego i ASYNC_DB=1 na goracych endpointach.
+# Tworzy tymczasowa baze SQLite z danymi testowymi, potem dla kazdego trybu
+# uruchamia osobny proces i wysyla rownolegle zadania przez ASGI.
+# uruchomienie: python bench_db_modes.py [zadania] [wspolbieznosc]
+from datetime import datetime, timedelta, timezone
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+CONCURRENCY = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+ENDPOINTS = ["/matches", "/leaderboard", "/my-predictions"]
+
+
+def seed(users: int = 200, matches: int = 104) -> str:
+    from app.database import SessionLocal
+    from app.migrations import run_migrations
+    from app.routes.users import create_access_token
+    from app.services.sample_data import seed_sample_data
+
+    run_migrations()
+    db = SessionLocal()
+    user_ids, _ = seed_sample_data(
+        db, users, matches, start=datetime.now(timezone.utc) + timedelta(days=1), prefix="bench"
+    )
+    db.commit()
+    db.close()
+
+    return create_access_token({"sub": "bench0", "uid": user_ids[0], "ver": 0})
+
+
+async def hammer() -> None:
+    import httpx
+
+    from app.main import app
+
+    headers = {"Authorization": f"Bearer {os.environ['BENCH_TOKEN']}"}
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for endpoint in ENDPOINTS:
+            latencies = []
+
+            async def one() -> None:
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await client.get(endpoint, headers=headers)
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - started)
+
+            await one()  # rozgrzanie
+            latencies.clear()
+
+            started = time.perf_counter()
+            await asyncio.gather(*(one() for _ in range(REQUESTS)))
+            elapsed = time.perf_counter() - started
+
+            latencies.sort()
+            print(
+                f"  {endpoint:<16} req/s={REQUESTS / elapsed:8.1f} "
+                f"p50={latencies[len(latencies) // 2] * 1000:7.1f}ms "
+                f"p95={latencies[int(len(latencies) * 0.95)] * 1000:7.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    if os.getenv("BENCH_CHILD"):
+        asyncio.run(hammer())
+        sys.exit(0)
+
+    workdir = tempfile.mkdtemp(prefix="ms2026-bench-")
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "SECRET_KEY": os.getenv("SECRET_KEY", "bench-secret"),
+    }
+    os.environ.update(env)
+    env["BENCH_TOKEN"] = seed()
+
+    for mode, async_db in (("sync", "0"), ("async", "1")):
+        print(f"{mode} (zadan={REQUESTS}, wspolbieznosc={CONCURRENCY})")
+        subprocess.run(
+            [sys.executable, __file__, str(REQUESTS), str(CONCURRENCY)],
+            env={**env, "BENCH_CHILD": "1", "ASYNC_DB": async_db},
+            check=True,
+        )
@@ -0,0 +1,33 @@
+# bench_passwords.py
+# Przepustowosc logowania (weryfikacja Argon2) przy aktualnych parametrach z env:
+#   ARGON2_TIME_COST, ARGON2_MEMORY_COST, ARGON2_PARALLELISM, PASSWORD_HASH_WORKERS
+# uruchomienie: python bench_passwords.py [liczba_logowan]
+from concurrent.futures import ThreadPoolExecutor
+import os
+import sys
+import time
+
+from app.services.passwords import HASH_WORKERS, get_argon2_settings, hash_password, verify_password
+
+logins = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+cores = os.cpu_count() or 1
+
+password_hash = hash_password("benchmark-password")
+print(f"Argon2: {get_argon2_settings() or 'domyslne passlib'} -> {password_hash.split('$')[3]}")
+
+
+def run(workers: int) -> float:
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda _: verify_password("benchmark-password", password_hash), range(logins)))
+
+    return logins / (time.perf_counter() - started)
+
+
+for workers in sorted({1, HASH_WORKERS}):
+    rate = run(workers)
+    print(
+        f"workers={workers:<3} logowan/s={rate:8.1f} "
+        f"na rdzen={rate / min(workers, cores):8.1f} (rdzenie={cores})"
+    )
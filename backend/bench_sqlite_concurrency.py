@@ -0,0 +1,143 @@
+# bench_sqlite_concurrency.py
+# N watkow czyta ranking i liste meczow, a jeden watek w tym czasie wpisuje
+# i cofa wyniki meczow (jak admin przy wprowadzaniu wynikow).
+# Porownuje domyslny SQLite z SQLITE_PROFILE=production i liczy bledy
+# "database is locked" oraz opoznienia odczytow.
+# uruchomienie: python bench_sqlite_concurrency.py [czytelnicy] [sekundy]
+from datetime import datetime, timedelta, timezone
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+READERS = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+SECONDS = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+
+
+def seed(users: int = 200, matches: int = 64) -> None:
+    from app.database import SessionLocal
+    from app.migrations import run_migrations
+    from app.services.sample_data import seed_sample_data
+
+    run_migrations()
+    db = SessionLocal()
+    seed_sample_data(db, users, matches, start=datetime.now(timezone.utc) + timedelta(days=1), prefix="bench")
+    db.commit()
+    db.close()
+
+
+def hammer() -> None:
+    from sqlalchemy.exc import OperationalError
+
+    from app.database import ReadSessionLocal, SessionLocal
+    from app.models import Match
+    from app.routes.matches import matches_with_counts_statement
+    from app.routes.predictions import standings_statement
+    from app.services.scoring import clear_final_result, set_final_result
+    from app.services.standings import LEADERBOARD_ORDER
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    latencies: list[float] = []
+    errors = {"read": 0, "write": 0}
+    writes = 0
+
+    def reader() -> None:
+        local = []
+
+        while not stop.is_set():
+            db = ReadSessionLocal()
+            started = time.perf_counter()
+
+            try:
+                db.scalars(standings_statement(LEADERBOARD_ORDER, 0, 50)).all()
+                db.execute(matches_with_counts_statement()).all()
+                local.append(time.perf_counter() - started)
+            except OperationalError as error:
+                if "locked" not in str(error):
+                    raise
+                with lock:
+                    errors["read"] += 1
+            finally:
+                db.close()
+
+        with lock:
+            latencies.extend(local)
+
+    def writer() -> None:
+        nonlocal writes
+        match_id = 0
+
+        while not stop.is_set():
+            match_id = match_id % 64 + 1
+            db = SessionLocal()
+
+            try:
+                match = db.get(Match, match_id)
+
+                if match.is_finished:
+                    clear_final_result(db, match)
+                else:
+                    set_final_result(db, match, match_id % 3, match_id % 2)
+
+                db.commit()
+                writes += 1
+            except OperationalError as error:
+                db.rollback()
+                if "locked" not in str(error):
+                    raise
+                errors["write"] += 1
+            finally:
+                db.close()
+
+    threads = [threading.Thread(target=reader) for _ in range(READERS)]
+    threads.append(threading.Thread(target=writer))
+
+    for thread in threads:
+        thread.start()
+
+    time.sleep(SECONDS)
+    stop.set()
+
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    print(
+        f"  odczytow/s={len(latencies) / SECONDS:8.1f} "
+        f"p50={latencies[len(latencies) // 2] * 1000:7.1f}ms "
+        f"p95={latencies[int(len(latencies) * 0.95)] * 1000:7.1f}ms "
+        f"zapisow/s={writes / SECONDS:6.1f} "
+        f"locked: odczyt={errors['read']} zapis={errors['write']}"
+    )
+
+
+if __name__ == "__main__":
+    if os.getenv("BENCH_CHILD"):
+        hammer()
+        sys.exit(0)
+
+    for profile in ("default", "production"):
+        workdir = tempfile.mkdtemp(prefix="ms2026-bench-")
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+            "SECRET_KEY": os.getenv("SECRET_KEY", "bench-secret"),
+            "SQLITE_PROFILE": profile,
+            "SQLITE_READERS": str(READERS),
+        }
+
+        subprocess.run(
+            [sys.executable, "-c", "import bench_sqlite_concurrency as b; b.seed()"],
+            env=env,
+            check=True,
+        )
+
+        print(f"{profile} (czytelnicy={READERS}, czas={SECONDS}s)")
+        subprocess.run(
+            [sys.executable, __file__, str(READERS), str(SECONDS)],
+            env={**env, "BENCH_CHILD": "1"},
+            check=True,
+        )
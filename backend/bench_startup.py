@@ -0,0 +1,143 @@
+# bench_startup.py
+# Zimny start procesu API:
+#   1. czas importu modulow app.* i najciezszych zaleznosci (python -X importtime)
+#   2. czas do pierwszej odpowiedzi /health z uvicorn oraz pierwsze zadania
+#      do ciezszych endpointow (login, /matches, projekcja)
+# Kazdy pomiar to nowy proces na tymczasowej bazie SQLite.
+# uruchomienie: python bench_startup.py [powtorzenia]
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+RUNS = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+TOP_MODULES = ("fastapi", "sqlalchemy", "jose", "passlib", "argon2", "numpy", "urllib.request")
+
+
+def import_times(env: dict) -> dict[str, int]:
+    """
+    Laczny czas importu (us) dla modulow app.* i TOP_MODULES.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+
+        _, cumulative, name = line.split("|")
+        name = name.strip()
+
+        if name.startswith("app") or name in TOP_MODULES:
+            try:
+                times[name] = int(cumulative)
+            except ValueError:
+                continue
+
+    return times
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def request(url: str, data: dict | None = None, token: str | None = None) -> float:
+    headers = {"Content-Type": "application/json"}
+
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+
+    body = json.dumps(data).encode() if data is not None else None
+    started = time.perf_counter()
+
+    with urllib.request.urlopen(urllib.request.Request(url, data=body, headers=headers)) as response:
+        response.read()
+
+    return time.perf_counter() - started
+
+
+def cold_start(env: dict) -> dict[str, float]:
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+
+    try:
+        while True:
+            try:
+                request(f"{base}/health")
+                break
+            except OSError:
+                if server.poll() is not None:
+                    raise RuntimeError("uvicorn nie wystartowal")
+                time.sleep(0.005)
+
+        timings = {"/health": time.perf_counter() - started}
+        timings["/login"] = request(f"{base}/login", {"username": "bench", "password": "bench-password"})
+        timings["/matches"] = request(f"{base}/matches")
+        timings["/leaderboard/projection"] = request(f"{base}/leaderboard/projection")
+
+        return timings
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    workdir = tempfile.mkdtemp(prefix="ms2026-startup-")
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "SECRET_KEY": os.getenv("SECRET_KEY", "bench-secret"),
+        "EMAIL_LOG_PATH": os.path.join(workdir, "email.txt"),
+        "PYTHONPATH": os.path.dirname(os.path.abspath(__file__)),
+    }
+
+    # schemat + jeden uzytkownik do logowania
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "from app.database import SessionLocal\n"
+            "from app.migrations import run_migrations\n"
+            "from app.models import User, UserStanding\n"
+            "from app.services.passwords import hash_password\n"
+            "run_migrations()\n"
+            "db = SessionLocal()\n"
+            "db.add(User(username='bench', email='bench@example.com',\n"
+            "            password_hash=hash_password('bench-password'), standing=UserStanding(username='bench')))\n"
+            "db.commit()\n",
+        ],
+        env=env,
+        check=True,
+    )
+
+    imports = [import_times(env) for _ in range(RUNS)]
+    print(f"Import (ms, mediana z {RUNS}):")
+
+    for name in sorted(imports[0], key=lambda module: -imports[0][module]):
+        values = sorted(run.get(name, 0) for run in imports)
+        print(f"  {name:<32} {values[len(values) // 2] / 1000:8.1f}")
+
+    starts = [cold_start(env) for _ in range(RUNS)]
+    print(f"Zimny start uvicorn (ms, mediana z {RUNS}):")
+
+    for name in starts[0]:
+        values = sorted(run[name] for run in starts)
+        print(f"  {name:<32} {values[len(values) // 2] * 1000:8.1f}")
@@ -0,0 +1,15 @@
+# migrate.py
+# Wykonuje brakujace migracje schematu (to samo robi start aplikacji)
+# i wypisuje historie z tabeli schema_version.
+from sqlalchemy import select
+
+from app.database import engine
+from app.migrations import LATEST_VERSION, run_migrations, schema_version
+
+run_migrations()
+
+with engine.connect() as connection:
+    for row in connection.execute(select(schema_version).order_by(schema_version.c.version)):
+        print(f"{row.version:>3}  {row.name:<40} {row.applied_at}")
+
+print(f"Schemat w wersji {LATEST_VERSION}.")
@@ -0,0 +1,14 @@
+# rebuild_standings.py
+from app.database import SessionLocal
+from app.services.standings import rebuild_snapshots, rebuild_standings
+
+# pelne przeliczenie tabel user_standings i standings_snapshots
+# (naprawa po recznych zmianach w bazie)
+db = SessionLocal()
+
+standings_count = rebuild_standings(db)
+snapshots_count = rebuild_snapshots(db)
+db.commit()
+db.close()
+
+print(f"Przeliczono ranking dla {standings_count} uzytkownikow i {snapshots_count} snapshotow.")
@@ -0,0 +1,59 @@
+# Wspolna konfiguracja testow: backend/ na sys.path (pytest uruchamiany
+# z katalogu repo albo z backend/) i baza SQLite w katalogu tymczasowym,
+# ustawiona zanim app.database utworzy silnik.
+import itertools
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+WORKDIR = tempfile.mkdtemp(prefix="ms2026-tests-")
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'tests.db')}"
+os.environ["EMAIL_LOG_PATH"] = os.path.join(WORKDIR, "email.txt")
+os.environ["STARTUP_WARM_UP"] = "0"
+os.environ["ADMIN_USERS"] = "admin"
+os.environ.setdefault("SECRET_KEY", "tests-secret")
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def register(client):
+    """
+    register(username=None) zaklada uzytkownika (domyslnie z unikalna nazwa)
+    i zwraca naglowki Authorization z jego tokenem.
+    """
+    numbers = itertools.count()
+
+    def register(username: str | None = None) -> dict:
+        username = username or f"user{next(numbers)}"
+        response = client.post(
+            "/register",
+            json={"username": username, "email": f"{username}@example.com", "password": "tests-password"},
+        )
+        assert response.status_code == 200, response.text
+        token = client.post("/login", json={"username": username, "password": "tests-password"}).json()["access_token"]
+
+        return {"Authorization": f"Bearer {token}"}
+
+    return register
+
+
+@pytest.fixture(scope="session")
+def admin_headers(register):
+    return register("admin")
@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta, timezone
+import json
+
+from app.database import SessionLocal, engine
+from app.models import Match
+from app.routes import matches as matches_routes
+from app.services.user_cache import token_version_cache, user_cache
+
+START = datetime(2026, 6, 20, 18, 0, tzinfo=timezone.utc)
+
+
+def import_line(external_id: str, minutes: int, start: datetime = START) -> str:
+    return json.dumps({
+        "home_team": f"Home {external_id}",
+        "away_team": f"Away {external_id}",
+        "start_time": (start + timedelta(minutes=minutes)).isoformat(),
+        "stage": "group",
+        "external_source": "tests",
+        "external_id": external_id,
+    })
+
+
+def add_match(external_id: str) -> None:
+    with SessionLocal() as db:
+        db.add(Match(
+            home_team="Q",
+            away_team="Q",
+            start_time=START + timedelta(days=30),
+            stage="group",
+            external_source="tests",
+            external_id=external_id,
+        ))
+        db.commit()
+
+
+def test_import_reports_each_conflict_once(client, register, monkeypatch):
+    headers = register()
+    # dup-old byl w bazie przed importem, dup-race wstawiony rownolegle
+    # po sprawdzeniu existing_external_keys: INSERT paczki konczy sie IntegrityError
+    add_match("dup-old")
+    add_match("dup-race")
+    existing_external_keys = matches_routes.existing_external_keys
+    monkeypatch.setattr(
+        matches_routes,
+        "existing_external_keys",
+        lambda db, matches: existing_external_keys(db, matches) - {("tests", "dup-race")},
+    )
+    body = "\n".join(
+        import_line(external_id, minutes)
+        for minutes, external_id in enumerate(["dup-old", "dup-race", "new-1", "new-2"])
+    )
+
+    response = client.post("/matches/import", content=body.encode(), headers=headers)
+
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert result["created_count"] == 2
+    assert result["error_count"] == 2
+    assert [error["line"] for error in result["errors"]] == [1, 2]
+    assert all("tests/dup-" in error["detail"] for error in result["errors"])
+
+    with SessionLocal() as db:
+        assert {
+            match.external_id for match in db.query(Match).filter(Match.external_source == "tests")
+        } == {"dup-old", "dup-race", "new-1", "new-2"}
+
+
+def test_import_releases_connection_while_reading_body(client, register):
+    headers = register()
+    # zimne cache: autoryzacja pyta baze na sesji zapisu
+    user_cache.clear()
+    token_version_cache.clear()
+    checked_out = []
+
+    def body():
+        for minutes in range(3):
+            checked_out.append(engine.pool.checkedout())
+            yield (import_line(f"stream-{minutes}", minutes) + "\n").encode()
+
+    response = client.post("/matches/import", content=body(), headers=headers)
+
+    assert response.status_code == 200, response.text
+    assert response.json()["created_count"] == 3
+    assert checked_out == [0, 0, 0]
+
+
+def test_upsert_moving_finished_match_reorders_snapshots(client, register, admin_headers):
+    first, second = register(), register()
+    kickoff = datetime.now(timezone.utc) + timedelta(days=2)
+    body = "\n".join([import_line("move-1", 0, kickoff), import_line("move-2", 60, kickoff)])
+    match_ids = client.post("/matches/import", content=body.encode(), headers=admin_headers).json()["match_ids"]
+
+    for headers, match_id in ((first, match_ids[0]), (second, match_ids[1])):
+        response = client.post("/predictions", json={"match_id": match_id, "home_score": 2, "away_score": 0}, headers=headers)
+        assert response.status_code == 200, response.text
+
+    for match_id in match_ids:
+        response = client.put(f"/admin/matches/{match_id}/result", json={"home_score": 2, "away_score": 0}, headers=admin_headers)
+        assert response.status_code == 200, response.text
+
+    user_id = client.get("/me", headers=first).json()["id"]
+    history = client.get(f"/leaderboard/{user_id}/rank-history", headers=first).json()
+    assert [entry["match_id"] for entry in history] == match_ids
+
+    # move-1 po move-2
+    response = client.post(
+        "/matches/import?upsert=true",
+        content=import_line("move-1", 120, kickoff).encode(),
+        headers=admin_headers,
+    )
+    assert response.json()["updated_count"] == 1
+
+    history = client.get(f"/leaderboard/{user_id}/rank-history", headers=first).json()
+    assert [entry["match_id"] for entry in history] == match_ids[::-1]
+
+    client.post("/admin/standings/rebuild", headers=admin_headers)
+    assert client.get(f"/leaderboard/{user_id}/rank-history", headers=first).json() == history
@@ -0,0 +1,93 @@
+# Regresja planow zapytan na SQLite: gorace sciezki aplikacji wykonane na
+# bazie testowej, dla kazdego wyslanego zapytania EXPLAIN QUERY PLAN.
+# Test pada, jesli ktores zapytanie skanuje cala tabele bez indeksu.
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import re
+
+import pytest
+from sqlalchemy import event
+
+from app.database import Base, SessionLocal, engine
+from app.migrations import run_migrations
+from app.models import Match
+from app.routes.champion import team_exists
+from app.routes.matches import MatchFilters, matches_with_counts_statement
+from app.routes.predictions import get_match_predictions, leaderboard_user_history, my_predictions_statement
+from app.services.sample_data import seed_sample_data
+from app.services.scoring import clear_final_result, set_final_result
+
+TABLES = set(Base.metadata.tables)
+# "SCAN predictions" / "SCAN TABLE predictions" bez "USING ... INDEX"
+FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+
+
+def score_match(db, seeded):
+    match = db.get(Match, seeded.match_id)
+    set_final_result(db, match, 2, 1)
+    db.flush()
+    clear_final_result(db, match)
+
+
+# (nazwa, funkcja(db, seeded)) - to samo, co robia endpointy
+HOT_PATHS = [
+    ("set/clear result", score_match),
+    ("/matches", lambda db, seeded: db.execute(matches_with_counts_statement()).all()),
+    ("/matches?limit", lambda db, seeded: db.execute(matches_with_counts_statement(MatchFilters(limit=20))).all()),
+    ("/my-predictions", lambda db, seeded: db.execute(my_predictions_statement(seeded.user.id)).all()),
+    ("/matches/{id}/predictions", lambda db, seeded: get_match_predictions(seeded.match_id, db, seeded.user)),
+    ("/leaderboard/{id}/history", lambda db, seeded: leaderboard_user_history(seeded.user.id, 10, None, db)),
+    ("champion team_exists", lambda db, seeded: team_exists(db, "Team 7")),
+]
+
+
+@pytest.fixture(scope="module")
+def seeded():
+    run_migrations()
+
+    with SessionLocal() as db:
+        user_ids, match_ids = seed_sample_data(
+            db,
+            users=50,
+            matches=40,
+            start=datetime.now(timezone.utc) - timedelta(days=10),
+            spacing=timedelta(hours=12),
+            prefix="plan",
+        )
+        db.commit()
+
+    return SimpleNamespace(user=SimpleNamespace(id=user_ids[0], username="plan0"), match_id=match_ids[2])
+
+
+@pytest.mark.parametrize("run", [run for _, run in HOT_PATHS], ids=[name for name, _ in HOT_PATHS])
+def test_hot_path_has_no_full_scans(seeded, run):
+    captured: list[tuple[str, object]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and not statement.lstrip().upper().startswith(("PRAGMA", "EXPLAIN")):
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+
+    with SessionLocal() as db:
+        try:
+            run(db, seeded)
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+
+        assert captured
+        failures = []
+
+        for statement, parameters in captured:
+            plan = db.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+            scans = [
+                detail for *_, detail in plan
+                if (found := FULL_SCAN.match(detail)) and found.group(1) in TABLES
+            ]
+
+            if scans:
+                failures.append(f"{', '.join(scans)}: {' '.join(statement.split())}")
+
+        db.rollback()
+
+    assert not failures, "\n".join(failures)
@@ -0,0 +1,56 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models import Match, Prediction
+from app.services.scoring import calculate_points, points_expression
+
+# Typy i wyniki 0..20 (limit z PredictionCreate)
+SCORES = range(21)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+
+    with Session(engine) as session:
+        yield session
+
+    engine.dispose()
+
+
+def test_points_expression_matches_calculate_points(db):
+    db.add(Match(id=1, home_team="A", away_team="B", start_time=datetime(2026, 6, 11, tzinfo=timezone.utc)))
+    db.add_all(
+        Prediction(user_id=index + 1, match_id=1, home_score=home, away_score=away)
+        for index, (home, away) in enumerate((home, away) for home in SCORES for away in SCORES)
+    )
+    db.flush()
+
+    mismatches = []
+
+    for home_score in SCORES:
+        for away_score in SCORES:
+            match = SimpleNamespace(home_score=home_score, away_score=away_score)
+            rows = db.execute(
+                select(
+                    Prediction.home_score,
+                    Prediction.away_score,
+                    points_expression(home_score, away_score),
+                )
+            ).all()
+
+            assert len(rows) == len(SCORES) ** 2
+
+            mismatches += [
+                (home_score, away_score, row.home_score, row.away_score, points)
+                for row in rows
+                if (points := row[2]) != calculate_points(row, match)
+            ]
+
+    assert mismatches == []
@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from app.database import SessionLocal
+from app.models import StandingsSnapshot, UserStanding
+from app.services.standings import rebuild_snapshots, rebuild_standings
+
+
+def standings_rows(db) -> list[tuple]:
+    return db.execute(
+        select(
+            UserStanding.user_id,
+            UserStanding.username,
+            UserStanding.total_points,
+            UserStanding.settled_count,
+            UserStanding.exact_score_count,
+            UserStanding.beers,
+        ).order_by(UserStanding.user_id)
+    ).all()
+
+
+def snapshot_rows(db, match_ids: list[int]) -> list[tuple]:
+    return db.execute(
+        select(StandingsSnapshot.match_id, StandingsSnapshot.users_count, StandingsSnapshot.data)
+        .where(StandingsSnapshot.match_id.in_(match_ids))
+        .order_by(StandingsSnapshot.match_id)
+    ).all()
+
+
+def assert_matches_rebuild(match_ids: list[int]) -> None:
+    """
+    user_standings i snapshoty meczow scenariusza utrzymywane przyrostowo
+    == pelne przeliczenie (w transakcji wycofanej na koncu). Snapshoty
+    innych testow moga byc sprzed rejestracji pozniejszych uzytkownikow.
+    """
+    with SessionLocal() as db:
+        standings, snapshots = standings_rows(db), snapshot_rows(db, match_ids)
+        rebuild_standings(db)
+        rebuild_snapshots(db)
+        db.flush()
+
+        assert standings_rows(db) == standings
+        assert snapshot_rows(db, match_ids) == snapshots
+
+        db.rollback()
+
+
+def test_incremental_standings_match_rebuild(client, register, admin_headers):
+    users = [register() for _ in range(4)]
+    kickoff = datetime.now(timezone.utc) + timedelta(days=3)
+    matches = [
+        {
+            "home_team": f"Standings {index}",
+            "away_team": f"Standings {index + 1}",
+            "start_time": (kickoff + timedelta(hours=index)).isoformat(),
+            "stage": "group",
+        }
+        for index in range(4)
+    ]
+    match_ids = client.post("/matches/bulk", json={"matches": matches}, headers=admin_headers).json()["match_ids"]
+    prediction_ids = {}
+
+    for user_index, headers in enumerate(users):
+        for match_index, match_id in enumerate(match_ids):
+            response = client.post(
+                "/predictions",
+                json={"match_id": match_id, "home_score": user_index % 3, "away_score": match_index % 2},
+                headers=headers,
+            )
+            assert response.status_code == 200, response.text
+            prediction_ids[user_index, match_id] = response.json()["id"]
+
+    def put(url: str, payload: dict, headers: dict = admin_headers) -> None:
+        response = client.put(url, json=payload, headers=headers)
+        assert response.status_code == 200, response.text
+        assert_matches_rebuild(match_ids)
+
+    def delete(url: str) -> None:
+        response = client.delete(url, headers=admin_headers)
+        assert response.status_code == 200, response.text
+        assert_matches_rebuild(match_ids)
+
+    for user_index, headers in enumerate(users):
+        put(f"/predictions/{prediction_ids[user_index, match_ids[0]]}/beers", {"beers_count": user_index + 1}, headers)
+
+    # wyniki poza kolejnoscia startu
+    put(f"/admin/matches/{match_ids[2]}/result", {"home_score": 1, "away_score": 0})
+    put(f"/admin/matches/{match_ids[0]}/result", {"home_score": 0, "away_score": 0})
+    put(f"/admin/matches/{match_ids[1]}/result", {"home_score": 2, "away_score": 1})
+    # korekta wyniku
+    put(f"/admin/matches/{match_ids[0]}/result", {"home_score": 1, "away_score": 0})
+    # zmiana typu i piw na zakonczonym meczu (mecz jeszcze sie nie zaczal)
+    put(f"/predictions/{prediction_ids[1, match_ids[2]]}", {"home_score": 1, "away_score": 0}, users[1])
+    put(f"/predictions/{prediction_ids[2, match_ids[2]]}/beers", {"beers_count": 5}, users[2])
+    # cofniecie wyniku
+    delete(f"/admin/matches/{match_ids[1]}/result")
+    # usuniecie zakonczonego i niezakonczonego meczu
+    delete(f"/matches/{match_ids[0]}")
+    delete(f"/matches/{match_ids[3]}")
+
+    with SessionLocal() as db:
+        assert any(row.total_points for row in standings_rows(db))
+        assert [row.match_id for row in snapshot_rows(db, match_ids)] == [match_ids[2]]
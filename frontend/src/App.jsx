@@ -31,21 +31,16 @@ export default function App() {
     }
 
     try {
-      const [matchesData, predictionsData] = await Promise.all([
-        apiRequest("/matches"),
-        apiRequest("/my-predictions"),
-      ])
+      const data = await apiRequest("/bootstrap")
 
-      if (!Array.isArray(matchesData) || !Array.isArray(predictionsData)) {
+      if (!Array.isArray(data?.matches) || !data?.predictions) {
         setPendingPredictionsCount(0)
         return
       }
 
-      const predictedMatchIds = new Set(
-        predictionsData.map(prediction => String(prediction.match_id))
-      )
+      const predictedMatchIds = new Set(Object.keys(data.predictions))
       const now = new Date()
-      const count = matchesData.filter(match => {
+      const count = data.matches.filter(match => {
         const matchStarted = new Date(match.start_time) <= now
 
         return !match.is_finished && !matchStarted && !predictedMatchIds.has(String(match.id))
@@ -34,22 +34,19 @@ function ArrowIcon() {
 }
 
 export default function Dashboard() {
-  const [data, setData] = useState({ matches: [], predictions: [], ranking: [] })
+  const [data, setData] = useState({ matches: [], predictions: [], standing: null, totalUsers: 0 })
   const [loading, setLoading] = useState(true)
   const [failed, setFailed] = useState(false)
   const username = getUsername()
 
   useEffect(() => {
-    Promise.all([
-      apiRequest("/matches"),
-      apiRequest("/my-predictions"),
-      apiRequest("/leaderboard"),
-    ])
-      .then(([matches, predictions, ranking]) => {
+    apiRequest("/bootstrap")
+      .then(bootstrap => {
         setData({
-          matches: Array.isArray(matches) ? matches : [],
-          predictions: Array.isArray(predictions) ? predictions : [],
-          ranking: Array.isArray(ranking) ? ranking : [],
+          matches: Array.isArray(bootstrap?.matches) ? bootstrap.matches : [],
+          predictions: bootstrap?.predictions ? Object.values(bootstrap.predictions) : [],
+          standing: bootstrap?.standing ?? null,
+          totalUsers: Number(bootstrap?.total_users ?? 0),
         })
       })
       .catch(() => setFailed(true))
@@ -67,9 +64,6 @@ export default function Dashboard() {
     const missing = upcoming.filter(match => !predictionByMatch.has(String(match.id)))
     const settled = data.predictions.filter(prediction => prediction.is_finished)
     const points = settled.reduce((total, prediction) => total + Number(prediction.points ?? 0), 0)
-    const ranking = [...data.ranking]
-      .sort((a, b) => Number(b.points ?? 0) - Number(a.points ?? 0))
-    const rankIndex = ranking.findIndex(player => player.username === username)
 
     return {
       upcoming,
@@ -80,13 +74,13 @@ export default function Dashboard() {
       points,
       settledCount: settled.length,
       exactCount: settled.filter(prediction => Number(prediction.points) === 2).length,
-      rank: rankIndex >= 0 ? rankIndex + 1 : null,
-      playersCount: ranking.length,
+      rank: data.standing?.position ?? null,
+      playersCount: data.totalUsers,
       progress: upcoming.length > 0
         ? Math.round(((upcoming.length - missing.length) / upcoming.length) * 100)
         : 100,
     }
-  }, [data, username])
+  }, [data])
 
   if (loading) {
     return <PageLoader title="Twój pulpit" subtitle="Układam najważniejsze informacje" cards={4} />
@@ -52,11 +52,8 @@ export default function Leaderboard() {
   const currentUser = getUsername()
 
   useEffect(() => {
-    Promise.all([
-      apiRequest("/leaderboard"),
-      apiRequest("/beer-leaderboard"),
-    ])
-      .then(([pointsData, beersData]) => {
+    apiRequest("/standings")
+      .then((standingsData) => {
         const buildRanking = (data, valueKey) => {
           if (!Array.isArray(data)) return []
 
@@ -81,8 +78,8 @@ export default function Leaderboard() {
         }
 
         setRankings({
-          points: buildRanking(pointsData, "points"),
-          beers: buildRanking(beersData, "beers"),
+          points: buildRanking(standingsData, "points"),
+          beers: buildRanking(standingsData, "beers"),
         })
         setLoading(false)
       })
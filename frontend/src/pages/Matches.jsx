@@ -215,15 +215,12 @@ export default function Matches({ onPredictionsChange }) {
 
   const fetchData = useCallback(async () => {
     try {
-      const [matchesData, predictionsData] = await Promise.all([
-        apiRequest("/matches"),
-        apiRequest("/my-predictions")
-      ])
+      const data = await apiRequest("/bootstrap")
 
-      if (!matchesData || !predictionsData) return
+      if (!data?.matches || !data?.predictions) return
 
-      setMatches(matchesData)
-      setMyPredictions(Array.isArray(predictionsData) ? predictionsData : [])
+      setMatches(data.matches)
+      setMyPredictions(Object.values(data.predictions))
 
     } catch {
       toast.error("Nie udało się załadować danych")